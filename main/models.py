@@ -4,6 +4,7 @@ from django.contrib.auth.models import AbstractUser
 from PIL import Image
 from django.utils.text import slugify
 from datetime import date
+from main1.divisions import default_division_table
 
 def upload_to(instance, filename):
     ext = filename.split('.')[-1]
@@ -206,52 +207,7 @@ class Athlete(models.Model):
         return age
     @property
     def get_weight_category(self):
-        if self.gender.lower() == 'male':
-            if 18 <= self.age <= 35:
-                if self.weight <= 54.9:
-                    return 'Fin Weight Division'
-                elif 55 <= self.weight <= 59.9:
-                    return 'Fly Weight Division'
-                elif 60 <= self.weight <= 64.9:
-                    return 'Bantam Weight Division'
-                elif 65 <= self.weight <= 69.9:
-                    return 'Feather Weight Division'
-                elif 70 <= self.weight <= 74.9:
-                    return 'Light Weight Division'
-                elif 75 <= self.weight <= 79.9:
-                    return 'Welter Weight Division'
-                elif 80 <= self.weight <= 84.9:
-                    return 'Middle Weight Division'
-                elif 85 <= self.weight <= 89.9:
-                    return 'Heavy Weight Division'
-                elif 90 <= self.weight <= 100:
-                    return 'Super Heavy Weight Division'
-                elif self.weight > 100:
-                    return 'Super Heavy Weight Division Level 1'
-            elif 36 <= self.age <= 49:
-                if 50.9 <= self.weight <= 59.9:
-                    return 'Fly Weight Division'
-                elif 60 <= self.weight <= 69.9:
-                    return 'Middle Weight Division'
-                elif 70 <= self.weight <= 79.9:
-                    return 'Heavy Weight Division'
-                elif 80 <= self.weight <= 89.9:
-                    return 'Super Heavy Weight Division'
-                elif self.weight >= 90:
-                    return 'Super Heavy Weight Division Level 0'
-        elif self.gender.lower() == 'female':
-            if 18 <= self.age <= 49:
-                if 50.9 <= self.weight <= 59.9:
-                    return 'Fly Weight Division'
-                elif 60 <= self.weight <= 69.9:
-                    return 'Middle Weight Division'
-                elif 70 <= self.weight <= 79.9:
-                    return 'Heavy Weight Division'
-                elif 80 <= self.weight <= 89.9:
-                    return 'Super Heavy Weight Division'
-                elif self.weight >= 90:
-                    return 'Super Heavy Weight Division Level 0'
-        return 'Unknown Category'
+        return default_division_table.classify(self.gender, self.dob, self.weight)
 
     def __str__(self):
         return f"{self.name} ({self.gender}, {self.age}yrs, {self.weight}Kg)"      
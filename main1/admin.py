@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (
-    Athlete, Coach, Staff, Media, Country, Belt, Category, RoleType, Club, Accommodation, Team, Membership
+    Athlete, Coach, Staff, Media, Country, Belt, Category, RoleType, Club, Accommodation, Team, Membership,
+    WeightDivisionRule, Bout, MedalTally
 )
 
 @admin.register(Athlete)
@@ -82,3 +83,18 @@ class MembershipAdmin(admin.ModelAdmin):
     search_fields = ('team__name', 'athlete__name')
     list_filter = ('team', 'athlete')
 
+@admin.register(WeightDivisionRule)
+class WeightDivisionRuleAdmin(admin.ModelAdmin):
+    list_display = ('gender', 'min_age', 'max_age', 'min_weight', 'min_weight_exclusive', 'max_weight', 'label')
+    list_filter = ('gender',)
+
+@admin.register(Bout)
+class BoutAdmin(admin.ModelAdmin):
+    list_display = ('tournament', 'category', 'gender', 'division', 'round', 'position', 'red', 'blue', 'winner')
+    list_filter = ('tournament', 'category', 'gender', 'division', 'round')
+    raw_id_fields = ('red', 'blue', 'winner')
+
+@admin.register(MedalTally)
+class MedalTallyAdmin(admin.ModelAdmin):
+    list_display = ('tournament', 'country', 'gold', 'silver', 'bronze')
+    list_filter = ('tournament',)
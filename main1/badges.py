@@ -0,0 +1,227 @@
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Rendering happens in pool workers that only need PyMuPDF; Django is only
+# imported lazily, by the functions that collect badges and sign tokens.
+
+# Portrait CR80 cards (54 x 85.6 mm) tiled 3 x 3 on A4, in points
+BADGE_WIDTH = 153
+BADGE_HEIGHT = 243
+SHEET_WIDTH = 595
+SHEET_HEIGHT = 842
+SHEET_MARGIN = 18
+BADGE_GAP = 6  # room for the guillotine between cards
+
+BAND_HEIGHT = 34
+PHOTO_RECT = (34.5, 42, 118.5, 150)  # 84 x 108, the 413:531 ratio of normalized photos
+NAME_BASELINE = 166
+DETAIL_BASELINE = 180
+QR_SIZE = 54
+TEXT_MARGIN = 8
+
+# Band colour per kind of credential, so marshals can tell them apart at a distance
+ROLE_COLOURS = {
+    'athlete': (0.12, 0.35, 0.75),
+    'coach': (0.10, 0.55, 0.27),
+    'staff': (0.88, 0.45, 0.05),
+    'media': (0.50, 0.20, 0.60),
+}
+BADGE_TOKEN_SALT = 'main1.badge'
+
+# What a badge shows; photo is a file path, raw bytes or None. Plain
+# strings and bytes, so badges can be sent to pool workers.
+Badge = namedtuple('Badge', ['kind', 'token', 'name', 'role', 'detail', 'photo'])
+
+
+def badge_token(kind, pk):
+    """Signed 'kind:pk:signature' token encoded in a badge's QR code."""
+    from django.core.signing import Signer
+
+    return Signer(salt=BADGE_TOKEN_SALT).sign(f'{kind}:{pk}')
+
+
+def read_badge_token(token):
+    """(kind, pk) from a badge token; raises django.core.signing.BadSignature if it was not issued by us."""
+    from django.core.signing import BadSignature, Signer
+
+    value = Signer(salt=BADGE_TOKEN_SALT).unsign(token.strip())
+    kind, _, pk = value.partition(':')
+    if kind not in ROLE_COLOURS or not pk.isdigit():
+        raise BadSignature(f'Malformed badge token {token!r}')
+    return kind, int(pk)
+
+
+def sheet_grid(columns, rows):
+    """Top-left corners of the badges on a sheet; raises ValueError if they do not fit on A4."""
+    width = columns * BADGE_WIDTH + (columns - 1) * BADGE_GAP
+    height = rows * BADGE_HEIGHT + (rows - 1) * BADGE_GAP
+    if columns < 1 or rows < 1 or width > SHEET_WIDTH - 2 * SHEET_MARGIN or height > SHEET_HEIGHT - 2 * SHEET_MARGIN:
+        raise ValueError(f'{columns} x {rows} badges do not fit on an A4 sheet.')
+    left, top = (SHEET_WIDTH - width) / 2, (SHEET_HEIGHT - height) / 2
+    return [
+        (left + column * (BADGE_WIDTH + BADGE_GAP), top + row * (BADGE_HEIGHT + BADGE_GAP))
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+def _fit_text(page, text, baseline, left, right, fontname, fontsize, minimum=6, colour=(0, 0, 0)):
+    # Centre `text` between left and right, shrinking it down to `minimum` and then cutting it short
+    import pymupdf
+
+    width = right - left
+    while fontsize > minimum and pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize) > width:
+        fontsize -= 0.5
+    while len(text) > 1 and pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize) > width:
+        text = text[:-4] + '...' if len(text) > 4 else text[:-1]
+    length = pymupdf.get_text_length(text, fontname=fontname, fontsize=fontsize)
+    page.insert_text(
+        (left + (width - length) / 2, baseline), text, fontname=fontname, fontsize=fontsize, color=colour,
+    )
+
+
+def _qr_pixmap(value):
+    import pymupdf
+
+    mupdf = pymupdf.mupdf
+    # Error correction level 2 (Q) survives a scuffed or partly covered card
+    return pymupdf.Pixmap(mupdf.fz_new_barcode_pixmap(mupdf.FZ_BARCODE_QRCODE, value, 0, 2, 1, 0))
+
+
+def draw_badge(page, x, y, badge):
+    import pymupdf
+
+    colour = ROLE_COLOURS[badge.kind]
+    card = pymupdf.Rect(x, y, x + BADGE_WIDTH, y + BADGE_HEIGHT)
+    page.draw_rect(card, color=(0.8, 0.8, 0.8), width=0.3)
+    page.draw_rect(pymupdf.Rect(x, y, x + BADGE_WIDTH, y + BAND_HEIGHT), color=None, fill=colour)
+    page.draw_rect(pymupdf.Rect(x, y + BADGE_HEIGHT - 5, x + BADGE_WIDTH, y + BADGE_HEIGHT), color=None, fill=colour)
+    _fit_text(page, badge.role.upper(), y + 22, x + TEXT_MARGIN, x + BADGE_WIDTH - TEXT_MARGIN, 'hebo', 14, colour=(1, 1, 1))
+
+    photo = pymupdf.Rect(PHOTO_RECT) + (x, y, x, y)
+    try:
+        if isinstance(badge.photo, bytes):
+            page.insert_image(photo, stream=badge.photo)
+        elif badge.photo:
+            page.insert_image(photo, filename=badge.photo)
+        else:
+            raise FileNotFoundError
+    except (FileNotFoundError, RuntimeError, ValueError):
+        # Missing or unreadable photos leave a space to stick a print on
+        page.draw_rect(photo, color=(0.6, 0.6, 0.6), fill=(0.93, 0.93, 0.93), width=0.5)
+        _fit_text(page, 'NO PHOTO', photo.y0 + photo.height / 2 + 3, photo.x0, photo.x1, 'helv', 8, colour=(0.5, 0.5, 0.5))
+
+    _fit_text(page, badge.name, y + NAME_BASELINE, x + TEXT_MARGIN, x + BADGE_WIDTH - TEXT_MARGIN, 'hebo', 12, 7)
+    _fit_text(page, badge.detail, y + DETAIL_BASELINE, x + TEXT_MARGIN, x + BADGE_WIDTH - TEXT_MARGIN, 'helv', 9)
+    left = x + (BADGE_WIDTH - QR_SIZE) / 2
+    top = y + BADGE_HEIGHT - 8 - QR_SIZE
+    page.insert_image(pymupdf.Rect(left, top, left + QR_SIZE, top + QR_SIZE), pixmap=_qr_pixmap(badge.token))
+
+
+def render_sheet(badges, columns=3, rows=3):
+    """One A4 page with `badges` (at most columns x rows) laid out on it, as PDF bytes."""
+    import pymupdf
+
+    document = pymupdf.open()
+    page = document.new_page(width=SHEET_WIDTH, height=SHEET_HEIGHT)
+    for (x, y), badge in zip(sheet_grid(columns, rows), badges):
+        draw_badge(page, x, y, badge)
+    # Photos are embedded as they are stored (JPEG), not decoded and re-encoded
+    return document.tobytes(garbage=1, deflate=True)
+
+
+def _render_job(job):
+    return render_sheet(*job)
+
+
+def render_sheets(badges, columns=3, rows=3, max_workers=None, window=8):
+    """Render `badges` onto sheets in a process pool, yielding PDF bytes per sheet in order.
+
+    Badges are taken from the iterable one sheet at a time and at most
+    `window` sheets are in flight, so only the photos of those sheets are
+    read at any moment however many badges are printed.
+    """
+    per_sheet = len(sheet_grid(columns, rows))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        sheet = []
+        try:
+            for badge in badges:
+                sheet.append(badge)
+                if len(sheet) == per_sheet:
+                    pending.append(executor.submit(_render_job, (sheet, columns, rows)))
+                    sheet = []
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+            if sheet:
+                pending.append(executor.submit(_render_job, (sheet, columns, rows)))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def write_badge_pdf(badges, path, **options):
+    """Render `badges` into one printable PDF at `path`; returns the number of sheets."""
+    import pymupdf
+
+    output = pymupdf.open()
+    for sheet in render_sheets(badges, **options):
+        with pymupdf.open(stream=sheet, filetype='pdf') as page:
+            output.insert_pdf(page)
+    sheets = output.page_count
+    if sheets:
+        output.save(path, garbage=1, deflate=True)
+    return sheets
+
+
+def _photo(field):
+    # Local files are read by the worker; other storages are read here
+    if not field:
+        return None
+    try:
+        return field.path
+    except NotImplementedError:
+        with field.open('rb') as photo:
+            return photo.read()
+
+
+def accredited(tournament=None):
+    """{kind: queryset} of the people accredited for `tournament`, or everyone active without one.
+
+    Athletes are those entered in the tournament and coaches those entered
+    or coaching an entered athlete; staff and media are accredited for
+    every tournament.
+    """
+    from django.db.models import Q
+    from .models import Athlete, Coach, Media, Staff, TournamentParticipation
+
+    if tournament is None:
+        athletes, coaches = Athlete.objects.filter(is_active=True), Coach.objects.all()
+    else:
+        entries = TournamentParticipation.objects.filter(tournament=tournament)
+        athletes = Athlete.objects.filter(pk__in=entries.values('athlete_id'))
+        coaches = Coach.objects.filter(Q(pk__in=entries.values('coach_id')) | Q(pk__in=athletes.values('coach_id')))
+    return {'athlete': athletes, 'coach': coaches, 'staff': Staff.objects.all(), 'media': Media.objects.all()}
+
+
+def collect_badges(kinds=tuple(ROLE_COLOURS), tournament=None):
+    """Badges for everyone of `kinds` accredited for `tournament`, ordered by kind and name.
+
+    Profiles are read in chunks, so this can feed render_sheets directly.
+    """
+    sources = accredited(tournament)
+    for kind in ('athlete', 'coach'):
+        sources[kind] = sources[kind].select_related('country')
+    for kind in kinds:
+        for profile in sources[kind].order_by('name').iterator(chunk_size=500):
+            if kind == 'athlete':
+                role, detail = 'Athlete', profile.country.name
+            elif kind == 'coach':
+                role, detail = 'Coach', profile.country.name
+            elif kind == 'staff':
+                role, detail = profile.get_role_display(), 'Organising Committee'
+            else:
+                role, detail = 'Media', f'{profile.get_role_display()}, {profile.media_house}'
+            yield Badge(kind, badge_token(kind, profile.pk), profile.name, role, detail, _photo(profile.passport_photo))
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+
+# Cached pages and lookups are keyed under generation numbers that signals
+# bump when the underlying rows change, so a single cache.incr drops every
+# entry built from the old data without having to know their keys.
+LOOKUP_TIMEOUT = 60 * 60
+
+PEOPLE_LISTS = 'people_lists'  # the coaches/athletes lists
+TOURNAMENT_LIST = 'tournament_list'
+CREDENTIALS = 'credentials'  # the check-in credential indexes
+
+
+def cache_generation(name):
+    return cache.get_or_set(f'{name}:generation', 1, None)
+
+
+def bump_cache_generation(name):
+    try:
+        cache.incr(f'{name}:generation')
+    except ValueError:
+        cache.set(f'{name}:generation', 1, None)
+
+
+def invalidate_people_lists():
+    bump_cache_generation(PEOPLE_LISTS)
+
+
+def _lookup_key(model):
+    return f'lookup:{model._meta.label_lower}'
+
+
+def lookup_choices(model):
+    """[(pk, name), ...] of a small lookup table ordered by name, cached until one of its rows changes."""
+    key = _lookup_key(model)
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(model.objects.order_by('name').values_list('pk', 'name'))
+        cache.set(key, choices, LOOKUP_TIMEOUT)
+    return choices
+
+
+def invalidate_lookup(model):
+    cache.delete(_lookup_key(model))
+
+
+def countries():
+    from .models import Country
+    return lookup_choices(Country)
+
+
+def belts():
+    from .models import Belt
+    return lookup_choices(Belt)
+
+
+def categories():
+    from .models import Category
+    return lookup_choices(Category)
+
+
+def clubs():
+    from .models import Club
+    return lookup_choices(Club)
@@ -0,0 +1,255 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, namedtuple
+from django.core.signing import BadSignature
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from .badges import accredited, read_badge_token
+from .caching import CREDENTIALS, cache_generation
+from .live import publish
+from .models import Accommodation, CheckIn
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAX_AGE = 5 * 60  # rebuild at least this often, for changes made without signals
+BATCH_SIZE = 50
+FLUSH_SECONDS = 2
+
+# What a scanner needs to know about an accredited person
+Credential = namedtuple(
+    'Credential', ['kind', 'pk', 'name', 'accommodation_id', 'arrival_date', 'departure_date'],
+    defaults=(None, None, None),  # staff and media have no booking
+)
+
+
+class CredentialIndex:
+    """Everyone accredited for a tournament, held in memory so scans never read the database.
+
+    Built with one query per kind of credential. `seen` holds the
+    (kind, pk, accommodation id) check-ins already made, so repeat scans
+    are reported; it is per process, so a person scanned on a scanner
+    served by another process only shows as a repeat after a rebuild.
+    """
+
+    def __init__(self, tournament_id):
+        self.tournament_id = tournament_id
+        self.generation = cache_generation(CREDENTIALS)
+        self.built = time.monotonic()
+        self.credentials = {}
+        for kind, profiles in accredited(tournament_id).items():
+            fields = ['pk', 'name']
+            if kind in ('athlete', 'coach'):
+                fields += ['accommodation_id', 'arrival_date', 'departure_date']
+            for row in profiles.values_list(*fields):
+                self.credentials[kind, row[0]] = Credential(kind, *row)
+        self.accommodations = dict(Accommodation.objects.values_list('pk', 'name'))
+        self.seen = set(
+            CheckIn.objects.filter(tournament_id=tournament_id)
+            .values_list('kind', 'profile_id', 'accommodation_id').distinct()
+        )
+
+    def stale(self, generation):
+        return generation != self.generation or time.monotonic() - self.built > INDEX_MAX_AGE
+
+    def expected(self):
+        """{accommodation id: people booked there}."""
+        return Counter(
+            credential.accommodation_id for credential in self.credentials.values() if credential.accommodation_id
+        )
+
+
+class CheckInBuffer:
+    """Check-ins waiting to be written, saved with one bulk insert per batch.
+
+    A batch is written once BATCH_SIZE scans have piled up or FLUSH_SECONDS
+    after the first of them, whichever comes first, and on shutdown. Each
+    write publishes the new headcount on the tournament's live feed.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._rows = []
+        self._timer = None
+
+    def add(self, check_in):
+        with self._lock:
+            self._rows.append(check_in)
+            full = len(self._rows) >= self.batch_size
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+
+    def _schedule(self):
+        # Called with the lock held
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_seconds, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def pending(self, tournament_id):
+        with self._lock:
+            return {
+                (row.kind, row.profile_id, row.accommodation_id)
+                for row in self._rows if row.tournament_id == tournament_id
+            }
+
+    def flush(self):
+        """Write the waiting check-ins; returns {tournament id: headcount} of the headcounts published.
+
+        If the database cannot be written to, the check-ins are put back
+        and retried FLUSH_SECONDS later. A check-in whose tournament or
+        accommodation has been deleted since it was scanned is logged and
+        dropped without taking the rest of the batch with it.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return {}
+        try:
+            rows = self._save(rows)
+        except DatabaseError:
+            logger.exception("Could not save %d check-in(s), retrying in %ss", len(rows), self.flush_seconds)
+            with self._lock:
+                self._rows[:0] = rows
+                self._schedule()
+            return {}
+        published = {}
+        for tournament_id in {row.tournament_id for row in rows}:
+            published[tournament_id] = headcount(tournament_id, flush=False)
+            publish(tournament_id, 'headcount', published[tournament_id])
+        return published
+
+    @staticmethod
+    def _save(rows):
+        # Returns the rows saved
+        try:
+            with transaction.atomic():
+                CheckIn.objects.bulk_create(rows)
+            return rows
+        except IntegrityError:
+            pass
+        saved = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.save()
+            except IntegrityError:
+                logger.exception(
+                    "Dropped check-in of %s %s at tournament %s, accommodation %s",
+                    row.kind, row.profile_id, row.tournament_id, row.accommodation_id,
+                )
+            else:
+                saved.append(row)
+        return saved
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()  # the timer thread's own connections
+
+
+_buffer = CheckInBuffer()
+atexit.register(_buffer.flush)
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(tournament_id):
+    """The credential index of a tournament, rebuilt when an accredited profile has changed."""
+    generation = cache_generation(CREDENTIALS)
+    index = _indexes.get(tournament_id)
+    if index is None or index.stale(generation):
+        with _indexes_lock:
+            index = _indexes.get(tournament_id)
+            if index is None or index.stale(generation):
+                index = CredentialIndex(tournament_id)
+                index.seen.update(_buffer.pending(tournament_id))  # not in the database yet
+                _indexes[tournament_id] = index
+    return index
+
+
+def scan(tournament_id, token, accommodation_id=None, user=None):
+    """Check a badge in at the arena, or at an accommodation when `accommodation_id` is given.
+
+    Returns (status, details) where status is 'ok', 'denied' (a genuine
+    badge, but not accredited for this tournament) or 'invalid' (not a
+    badge token we signed, or an accommodation we do not know). Nothing
+    is read from the database: the token is checked against its
+    signature and the credential index, and the check-in is queued for
+    the next batch.
+    """
+    try:
+        kind, pk = read_badge_token(token)
+    except BadSignature:
+        return 'invalid', {'message': 'This is not one of our badges.'}
+    index = get_index(tournament_id)
+    if accommodation_id is not None and accommodation_id not in index.accommodations:
+        return 'invalid', {'message': 'Unknown accommodation.'}
+    credential = index.credentials.get((kind, pk))
+    if credential is None:
+        return 'denied', {'message': 'Not accredited for this tournament.'}
+
+    warnings = []
+    if accommodation_id is not None:
+        if credential.accommodation_id is None:
+            warnings.append('Has no accommodation booked.')
+        elif credential.accommodation_id != accommodation_id:
+            warnings.append(f'Booked at {index.accommodations.get(credential.accommodation_id)}.')
+        today = timezone.localdate()
+        if credential.arrival_date and today < credential.arrival_date:
+            warnings.append(f'Not due to arrive until {credential.arrival_date:%d %b}.')
+        if credential.departure_date and today > credential.departure_date:
+            warnings.append(f'Was due to leave on {credential.departure_date:%d %b}.')
+    key = (kind, pk, accommodation_id)
+    repeat = key in index.seen
+    index.seen.add(key)
+    _buffer.add(CheckIn(
+        tournament_id=tournament_id, kind=kind, profile_id=pk, accommodation_id=accommodation_id,
+        scanned_at=timezone.now(), scanned_by=user if user is not None and user.is_authenticated else None,
+    ))
+    return 'ok', {
+        'name': credential.name,
+        'kind': kind,
+        'accommodation': index.accommodations.get(credential.accommodation_id),
+        'repeat': repeat,
+        'warnings': warnings,
+    }
+
+
+def headcount(tournament_id, flush=True):
+    """People checked in at each accommodation and at the arena, against the number expected.
+
+    Accommodations are those someone is booked at or has checked in at;
+    the arena comes last and expects every accredited person.
+    """
+    if flush:
+        published = _buffer.flush()
+        if tournament_id in published:
+            return published[tournament_id]
+    index = get_index(tournament_id)
+    counts = Counter()
+    rows = (
+        CheckIn.objects.filter(tournament_id=tournament_id)
+        .values_list('accommodation_id', 'kind')
+        .annotate(people=Count('profile_id', distinct=True))
+        .order_by()
+    )
+    for accommodation_id, _, people in rows:
+        counts[accommodation_id] += people
+    expected = index.expected()
+    table = [
+        {'accommodation': index.accommodations.get(pk, ''), 'checked_in': counts[pk], 'expected': expected[pk]}
+        for pk in sorted(set(expected) | (set(counts) - {None}), key=lambda pk: index.accommodations.get(pk, ''))
+    ]
+    table.append({'accommodation': None, 'checked_in': counts[None], 'expected': len(index.credentials)})
+    return table
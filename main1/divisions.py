@@ -0,0 +1,222 @@
+import bisect
+import json
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from django.db.models import Case, CharField, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+
+# A single weight division. min_weight/max_weight of None mean "no bound";
+# min_weight_exclusive is used for the open "over 100kg" style divisions.
+DivisionRule = namedtuple(
+    'DivisionRule',
+    ['gender', 'min_age', 'max_age', 'min_weight', 'max_weight', 'label', 'min_weight_exclusive'],
+    defaults=[False],
+)
+
+UNKNOWN_DIVISION = 'Unknown Category'
+
+# The rules the old if/elif ladder in BaseProfile.get_weight_category encoded.
+# Bounds are kept as the same float literals so Decimal weights compare exactly
+# as they did before (e.g. 54.95kg still falls in the gap between Fin and Fly).
+DEFAULT_DIVISION_RULES = [
+    DivisionRule('male', 18, 35, None, 54.9, 'Fin Weight Division'),
+    DivisionRule('male', 18, 35, 55, 59.9, 'Fly Weight Division'),
+    DivisionRule('male', 18, 35, 60, 64.9, 'Bantam Weight Division'),
+    DivisionRule('male', 18, 35, 65, 69.9, 'Feather Weight Division'),
+    DivisionRule('male', 18, 35, 70, 74.9, 'Light Weight Division'),
+    DivisionRule('male', 18, 35, 75, 79.9, 'Welter Weight Division'),
+    DivisionRule('male', 18, 35, 80, 84.9, 'Middle Weight Division'),
+    DivisionRule('male', 18, 35, 85, 89.9, 'Heavy Weight Division'),
+    DivisionRule('male', 18, 35, 90, 100, 'Super Heavy Weight Division'),
+    DivisionRule('male', 18, 35, 100, None, 'Super Heavy Weight Division Level 1', True),
+    DivisionRule('male', 36, 49, 50.9, 59.9, 'Fly Weight Division'),
+    DivisionRule('male', 36, 49, 60, 69.9, 'Middle Weight Division'),
+    DivisionRule('male', 36, 49, 70, 79.9, 'Heavy Weight Division'),
+    DivisionRule('male', 36, 49, 80, 89.9, 'Super Heavy Weight Division'),
+    DivisionRule('male', 36, 49, 90, None, 'Super Heavy Weight Division Level 0'),
+    DivisionRule('female', 18, 49, 50.9, 59.9, 'Fly Weight Division'),
+    DivisionRule('female', 18, 49, 60, 69.9, 'Middle Weight Division'),
+    DivisionRule('female', 18, 49, 70, 79.9, 'Heavy Weight Division'),
+    DivisionRule('female', 18, 49, 80, 89.9, 'Super Heavy Weight Division'),
+    DivisionRule('female', 18, 49, 90, None, 'Super Heavy Weight Division Level 0'),
+]
+
+
+def calculate_age(dob, today=None):
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def birth_date_cutoff(today, years):
+    """Latest date of birth that is at least `years` old on `today`."""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # 29 February in a non-leap year
+        return today.replace(year=today.year - years, day=28)
+
+
+def age_expression(today=None):
+    """SQL expression equivalent to calculate_age() for the `dob` column."""
+    today = today or date.today()
+    birthday_pending = Q(dob__month__gt=today.month) | Q(dob__month=today.month, dob__day__gt=today.day)
+    return (
+        Value(today.year)
+        - ExtractYear('dob')
+        - Case(When(birthday_pending, then=Value(1)), default=Value(0), output_field=IntegerField())
+    )
+
+
+# Weights are stored with two decimal places. Quantizing the float bounds keeps
+# the SQL comparisons identical to the Decimal-vs-float ones done in Python.
+_CENTS = Decimal('0.01')
+
+
+def _weight_q(rule):
+    q = Q()
+    if rule.min_weight is not None:
+        bound = Decimal(rule.min_weight)
+        if rule.min_weight_exclusive:
+            q &= Q(weight__gt=bound.quantize(_CENTS, rounding=ROUND_FLOOR))
+        else:
+            q &= Q(weight__gte=bound.quantize(_CENTS, rounding=ROUND_CEILING))
+    if rule.max_weight is not None:
+        q &= Q(weight__lte=Decimal(rule.max_weight).quantize(_CENTS, rounding=ROUND_FLOOR))
+    return q & Q(weight__isnull=False)
+
+
+class _AgeBand:
+    def __init__(self, min_age, max_age, rules):
+        self.min_age = min_age
+        self.max_age = max_age
+        self.rules = sorted(rules, key=lambda r: (float('-inf') if r.min_weight is None else r.min_weight))
+        self.lower_bounds = [float('-inf') if r.min_weight is None else r.min_weight for r in self.rules]
+
+    def lookup(self, weight):
+        index = bisect.bisect_right(self.lower_bounds, weight) - 1
+        if index >= 0 and self.rules[index].min_weight_exclusive and weight == self.lower_bounds[index]:
+            index -= 1
+        if index < 0:
+            return UNKNOWN_DIVISION
+        rule = self.rules[index]
+        if rule.max_weight is not None and weight > rule.max_weight:
+            return UNKNOWN_DIVISION
+        return rule.label
+
+
+class DivisionTable:
+    """Compiled weight-division rules, looked up by gender, age band and weight."""
+
+    def __init__(self, rules):
+        grouped = {}
+        for rule in rules:
+            key = (rule.gender.lower(), rule.min_age, rule.max_age)
+            grouped.setdefault(key, []).append(rule)
+
+        self.bands = {}
+        for (gender, min_age, max_age), band_rules in grouped.items():
+            self.bands.setdefault(gender, []).append(_AgeBand(min_age, max_age, band_rules))
+        self.band_starts = {}
+        for gender, bands in self.bands.items():
+            bands.sort(key=lambda b: b.min_age)
+            self.band_starts[gender] = [b.min_age for b in bands]
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        return cls(
+            DivisionRule(
+                r.gender, r.min_age, r.max_age, r.min_weight, r.max_weight, r.label, r.min_weight_exclusive
+            )
+            for r in queryset
+        )
+
+    @classmethod
+    def from_fixture(cls, path):
+        """Build a table from a `loaddata`-style fixture of WeightDivisionRule rows."""
+        with open(path) as fixture:
+            entries = json.load(fixture)
+        rules = []
+        for entry in entries:
+            fields = entry.get('fields', entry)
+            rules.append(DivisionRule(
+                fields['gender'], fields['min_age'], fields['max_age'],
+                fields.get('min_weight'), fields.get('max_weight'), fields['label'],
+                fields.get('min_weight_exclusive', False),
+            ))
+        return cls(rules)
+
+    def classify_age(self, gender, age, weight):
+        if not gender or weight is None:
+            return UNKNOWN_DIVISION
+        gender = gender.lower()
+        starts = self.band_starts.get(gender)
+        if not starts:
+            return UNKNOWN_DIVISION
+        index = bisect.bisect_right(starts, age) - 1
+        if index < 0:
+            return UNKNOWN_DIVISION
+        band = self.bands[gender][index]
+        if age > band.max_age:
+            return UNKNOWN_DIVISION
+        return band.lookup(weight)
+
+    def rules(self):
+        for bands in self.bands.values():
+            for band in bands:
+                yield from band.rules
+
+    def as_expression(self, today=None):
+        """Case/When expression computing the division label for a profile row in SQL."""
+        today = today or date.today()
+        whens = [
+            When(
+                Q(
+                    gender__iexact=rule.gender,
+                    dob__lte=birth_date_cutoff(today, rule.min_age),
+                    dob__gt=birth_date_cutoff(today, rule.max_age + 1),
+                ) & _weight_q(rule),
+                then=Value(rule.label),
+            )
+            for rule in self.rules()
+        ]
+        return Case(*whens, default=Value(UNKNOWN_DIVISION), output_field=CharField())
+
+    def classify(self, gender, dob, weight, today=None):
+        return self.classify_age(gender, calculate_age(dob, today), weight)
+
+    def classify_many(self, rows, today=None):
+        """Classify an iterable of (gender, dob, weight) tuples in one pass."""
+        today = today or date.today()
+        return [self.classify_age(gender, calculate_age(dob, today), weight) for gender, dob, weight in rows]
+
+    def classify_queryset(self, queryset, today=None):
+        """Return {pk: division} for an Athlete or Coach queryset using a single query."""
+        today = today or date.today()
+        return {
+            pk: self.classify_age(gender, calculate_age(dob, today), weight)
+            for pk, gender, dob, weight in queryset.values_list('pk', 'gender', 'dob', 'weight').iterator()
+        }
+
+
+default_division_table = DivisionTable(DEFAULT_DIVISION_RULES)
+
+_division_table = None
+
+
+def get_division_table():
+    """Return the process-wide table, loading WeightDivisionRule rows on first use.
+
+    Falls back to DEFAULT_DIVISION_RULES while the rule table is empty.
+    """
+    global _division_table
+    if _division_table is None:
+        from .models import WeightDivisionRule
+
+        rules = list(WeightDivisionRule.objects.all())
+        _division_table = DivisionTable.from_queryset(rules) if rules else default_division_table
+    return _division_table
+
+
+def reset_division_table():
+    global _division_table
+    _division_table = None
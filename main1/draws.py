@@ -0,0 +1,151 @@
+import random
+from collections import namedtuple
+from django.db import transaction
+
+# An entrant of a bracket: the participation row plus what seeding separates on.
+Entrant = namedtuple('Entrant', ['participation_id', 'country_id', 'club_id'])
+
+# A bout as produced by build_bouts(); red/blue/winner are participation ids or None.
+BoutSlot = namedtuple('BoutSlot', ['round', 'position', 'red', 'blue', 'winner'])
+
+
+def bracket_size(count):
+    """Smallest power of two that holds `count` entrants."""
+    size = 1
+    while size < count:
+        size *= 2
+    return size
+
+
+def _deal(entrants, size):
+    # Entrants arrive grouped by country and club, so dealing them alternately
+    # into the two halves splits every country (and every club within it) as
+    # evenly as possible. Recursing on each half keeps them apart as long as
+    # the bracket allows. The left half gets the odd entrant, so byes are
+    # spread out and no first-round bout is bye against bye.
+    if size == 1:
+        return [entrants[0] if entrants else None]
+    half = size // 2
+    return _deal(entrants[0::2], half) + _deal(entrants[1::2], half)
+
+
+def seed_bracket(entrants, rng=None):
+    """Return the first-round slots for `entrants`, padded with None for byes.
+
+    Entrants from the same country, then the same club, are placed as far
+    apart in the bracket as possible. The order within those groups, and of
+    the groups themselves, is random (`rng` makes it reproducible).
+    """
+    rng = rng or random.Random()
+    entrants = list(entrants)
+    rng.shuffle(entrants)
+    countries, clubs = {}, {}
+    for entrant in entrants:
+        countries.setdefault(entrant.country_id, len(countries))
+        clubs.setdefault(entrant.club_id, len(clubs))
+    entrants.sort(key=lambda e: (countries[e.country_id], clubs[e.club_id]))
+    return _deal(entrants, bracket_size(len(entrants)))
+
+
+def build_bouts(slots):
+    """Expand first-round slots into every bout of the bracket.
+
+    Byes are resolved straight away: the entrant without an opponent is the
+    winner of the round 1 bout and already sits in their round 2 corner.
+    """
+    bouts = []
+    current = slots
+    round_number = 1
+    while len(current) > 1:
+        advancing = []
+        for position in range(len(current) // 2):
+            red, blue = current[2 * position], current[2 * position + 1]
+            winner = None
+            if round_number == 1 and (red is None) != (blue is None):
+                winner = red if red is not None else blue
+            bouts.append(BoutSlot(round_number, position, red, blue, winner))
+            advancing.append(winner)
+        current = advancing
+        round_number += 1
+    return bouts
+
+
+def bracket_entrants(tournament, category=None, division=None, today=None):
+    """Group a tournament's registrations into brackets.
+
+    Returns {(category_id, gender, division): [Entrant, ...]}. Athletes and
+    coaches who compete are read with one query each, with their division
+    computed in SQL.
+    """
+    from .models import Athlete, Coach, TournamentParticipation
+
+    registrations = TournamentParticipation.objects.filter(tournament=tournament)
+    if category is not None:
+        registrations = registrations.filter(category=category)
+    profiles = {}
+    for model, kind in ((Athlete, 'athlete'), (Coach, 'coach')):
+        entrants = model.objects.filter(tournamentparticipation__tournament=tournament)
+        if model is Coach:
+            entrants = entrants.filter(is_athlete=True)
+        for pk, gender, division_label, country_id, club_id in (
+            entrants.with_division(today=today).distinct()
+            .values_list('pk', 'gender', 'division', 'country_id', 'region_id')
+        ):
+            profiles[kind, pk] = (gender, division_label, country_id, club_id)
+
+    brackets = {}
+    for pk, athlete_id, coach_id, category_id in registrations.values_list('pk', 'athlete_id', 'coach_id', 'category_id'):
+        # Rows without an athlete are coaches entering themselves
+        profile = profiles.get(('athlete', athlete_id)) if athlete_id else profiles.get(('coach', coach_id))
+        if profile is None:
+            continue
+        gender, division_label, country_id, club_id = profile
+        if division is not None and division_label != division:
+            continue
+        brackets.setdefault((category_id, gender, division_label), []).append(Entrant(pk, country_id, club_id))
+    return brackets
+
+
+def generate_draws(tournament, category=None, division=None, seed=None, today=None):
+    """Replace the brackets of `tournament` with freshly seeded ones.
+
+    Only the brackets being drawn are replaced; `category` and `division`
+    narrow that down. Placings won in the replaced bouts are cleared and the
+    medal table rebuilt without them. Returns (brackets, bouts) created.
+    """
+    from django.db.models import Q
+    from .live import publish
+    from .models import Bout, TournamentParticipation
+    from .results import medal_table, rebuild_medal_table
+
+    rng = random.Random(seed)
+    brackets = bracket_entrants(tournament, category, division, today)
+    bouts = []
+    for (category_id, gender, division_label), entrants in sorted(brackets.items(), key=lambda item: str(item[0])):
+        for slot in build_bouts(seed_bracket(entrants, rng)):
+            bouts.append(Bout(
+                tournament=tournament, category_id=category_id, gender=gender, division=division_label,
+                round=slot.round, position=slot.position,
+                red_id=slot.red and slot.red.participation_id,
+                blue_id=slot.blue and slot.blue.participation_id,
+                winner_id=slot.winner and slot.winner.participation_id,
+            ))
+
+    stale = Bout.objects.filter(tournament=tournament)
+    if category is not None:
+        stale = stale.filter(category=category)
+    if division is not None:
+        stale = stale.filter(division=division)
+    # Placings only come from bouts, so the old bouts' fighters hold them all
+    placed = TournamentParticipation.objects.filter(tournament=tournament, placing__isnull=False).filter(
+        Q(pk__in=stale.values('red_id')) | Q(pk__in=stale.values('blue_id')),
+    )
+    with transaction.atomic():
+        # update() sends no signals, so the medal table is rebuilt below instead
+        cleared = placed.update(placing=None)
+        stale.delete()
+        Bout.objects.bulk_create(bouts, batch_size=500)
+        if cleared:
+            rebuild_medal_table(tournament)
+            transaction.on_commit(lambda: publish(tournament.pk, 'medals', medal_table(tournament.pk)))
+    return len(brackets), len(bouts)
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import re
+import time
+from django.conf import settings
+
+# Generated forms are stored under a hash of the template contents and the
+# exact field values, so identical requests reuse the file on disk and any
+# change to the competitor, coach, belt or categories misses automatically.
+FORM_CACHE_DIR = os.path.join(settings.MEDIA_ROOT, 'completed_forms')
+FORM_CACHE_NAME = re.compile(r'^[0-9a-f]{64}\.pdf$')
+
+_template_digests = {}
+
+
+def template_digest(path):
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_digests.get(path)
+    if cached is None or cached[0] != signature:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as template:
+            for chunk in iter(lambda: template.read(1024 * 1024), b''):
+                digest.update(chunk)
+        cached = _template_digests[path] = (signature, digest.hexdigest())
+    return cached[1]
+
+
+def form_cache_key(template_path, data):
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{template_digest(template_path)}:{payload}'.encode()).hexdigest()
+
+
+def cached_form_path(template_path, data, fill, key=None):
+    """Return the path of the filled form for `data`, calling fill(data) only on a miss."""
+    key = key or form_cache_key(template_path, data)
+    path = os.path.join(FORM_CACHE_DIR, f'{key}.pdf')
+    if os.path.exists(path):
+        os.utime(path)  # Mark as recently used for prune_form_cache
+        return path
+
+    os.makedirs(FORM_CACHE_DIR, exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(fill(data))
+    os.replace(temp_path, path)
+    return path
+
+
+def prune_form_cache(max_age_days, dry_run=False):
+    """Delete cached forms not used for `max_age_days`. Returns the removed paths."""
+    if not os.path.isdir(FORM_CACHE_DIR):
+        return []
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = []
+    for entry in os.scandir(FORM_CACHE_DIR):
+        is_cached = FORM_CACHE_NAME.match(entry.name) or entry.name.endswith('.tmp')
+        if entry.is_file() and is_cached and entry.stat().st_mtime < cutoff:
+            if not dry_run:
+                os.remove(entry.path)
+            removed.append(entry.path)
+    return removed
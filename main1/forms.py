@@ -1,9 +1,10 @@
+import zipfile
 from django import forms
 from .models import Coach, Athlete, Staff, Media, Category, RoleType, Belt, Country, Team, Membership
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django import forms
 from .models import *
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 class DateInput(forms.DateInput):
     input_type = 'date'
 
@@ -171,46 +172,83 @@ class TournamentForm(forms.ModelForm):
 class TournamentParticipationForm(forms.ModelForm):
     class Meta:
         model = TournamentParticipation
-        fields = ['tournament', 'coach', 'athlete', 'category', 'performance']
+        fields = ['tournament', 'coach', 'athlete', 'category', 'placing', 'performance']
         widgets = {
             'performance': forms.Textarea(attrs={'rows': 3}),
         }        
 
-# JavaScript code to handle the display of the region field based on country selection
+def registration_candidates(tournament, coach=None):
+    """Active athletes not yet entered in `tournament`; with a `coach`, only theirs and their club's."""
+    entered = TournamentParticipation.objects.filter(tournament=tournament, athlete=OuterRef('pk'))
+    athletes = Athlete.objects.filter(is_active=True).exclude(Exists(entered))
+    if coach is not None:
+        scope = Q(coach=coach)
+        if coach.region_id:
+            scope |= Q(region_id=coach.region_id)
+        athletes = athletes.filter(scope)
+    return athletes
+
+
 class AthleteSelectionForm(forms.Form):
+    """Athletes to enter in a tournament.
+
+    The choices are never listed in full: the page picks athletes through
+    the register_athletes_search endpoint and posts their ids, and only
+    those ids are checked against the candidates.
+    """
     athletes = forms.ModelMultipleChoiceField(
         queryset=Athlete.objects.none(),  # Start with no athletes
-        widget=forms.CheckboxSelectMultiple
+        widget=forms.MultipleHiddenInput
     )
 
-    def __init__(self, *args, **kwargs):
-        tournament = kwargs.pop('tournament', None)  # Removed coach
+    def __init__(self, *args, tournament=None, coach=None, **kwargs):
         super().__init__(*args, **kwargs)
-
-        # Set the queryset for athletes, e.g., filtering athletes not already in the tournament
         if tournament:
-            self.fields['athletes'].queryset = Athlete.objects.filter(
-                ~Q(tournamentparticipation__tournament=tournament)
-            )
+            self.fields['athletes'].queryset = registration_candidates(tournament, coach)
+
+    def selected_athletes(self):
+        """The submitted athletes that can still be entered, to show again when the form is redisplayed."""
+        ids = [pk for pk in self['athletes'].value() or [] if str(pk).isdigit()]
+        if not ids:
+            return []
+        return self.fields['athletes'].queryset.filter(pk__in=ids).only('pk', 'name').order_by('name')
+
 
-class AthleteSelectionFormCoach(forms.Form):
+class CoachRegistrationForm(forms.Form):
+    """A coach's own active athletes not yet entered in the tournament, for the emailed registration link."""
     athletes = forms.ModelMultipleChoiceField(
-        queryset=Athlete.objects.none(),  # Start with no athletes
-        widget=forms.CheckboxSelectMultiple
+        queryset=Athlete.objects.none(),
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
     )
 
-    def __init__(self, *args, **kwargs):
-        tournament = kwargs.pop('tournament', None)
-        coach = kwargs.pop('coach', None)
+    def __init__(self, *args, tournament, coach, **kwargs):
         super().__init__(*args, **kwargs)
-        
-        if coach:
-            # Filter athletes based on the coach's region/club
-            if coach.region:
-                self.fields['athletes'].queryset = Athlete.objects.filter(
-                    region=coach.region
-                )
-            else:
-                self.fields['athletes'].queryset = Athlete.objects.filter(
-                    coach=coach
-                )
\ No newline at end of file
+        self.fields['athletes'].queryset = (
+            registration_candidates(tournament).filter(coach=coach).only('pk', 'name').order_by('name')
+        )
+        self.fields['athletes'].label_from_instance = lambda athlete: athlete.name
+
+
+class AthleteImportForm(forms.Form):
+    roster = forms.FileField(help_text='CSV or XLSX with a header row (name, dob or age, weight, belt, gender, ...).')
+    country = forms.ModelChoiceField(
+        queryset=Country.objects.all(), required=False,
+        help_text='Used for rows without a country column.',
+    )
+    photos = forms.FileField(
+        required=False,
+        help_text='Optional ZIP of photos named after each athlete, e.g. george-otieno-omollo.jpg.',
+    )
+    dry_run = forms.BooleanField(required=False, label='Only validate, do not save')
+
+    def clean_roster(self):
+        roster = self.cleaned_data['roster']
+        if not roster.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Upload a .csv or .xlsx file.')
+        return roster
+
+    def clean_photos(self):
+        photos = self.cleaned_data['photos']
+        if photos and not zipfile.is_zipfile(photos):
+            raise forms.ValidationError('Photos must be uploaded as a ZIP archive.')
+        return photos
@@ -0,0 +1,291 @@
+import csv
+import io
+import os
+import shutil
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.text import slugify
+from .caching import invalidate_people_lists, lookup_choices
+from .divisions import birth_date_cutoff
+from .models import Athlete, Belt, Club, Country, file_sha256, upload_to
+from .stats import invalidate_dashboard_counts
+
+# Rosters have a header row with some of: name, dob, age, weight, belt,
+# gender, country, club, passport, id_passport_number, email, contacts.
+# `name` is required, as is either `dob` or `age`; `country` may be left out
+# when a default country is given for the whole file.
+
+# Fields an import may change on athletes that already exist, and the roster
+# column each one comes from when the names differ. An `age` column alone
+# never overwrites a stored date of birth.
+UPDATE_FIELDS = [
+    'dob', 'weight', 'belt', 'gender', 'country', 'region', 'passport', 'id_passport_number', 'email', 'contacts',
+]
+UPDATE_COLUMNS = {'region': 'club'}
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+GENDERS = {choice.casefold(): choice for choice, _ in Athlete.GENDER_CHOICES}
+MAX_WEIGHT = Decimal('999.99')
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    photos: int = 0
+    errors: list = field(default_factory=list)  # (row number, name, message)
+
+    @property
+    def failed(self):
+        return len({row for row, _, _ in self.errors})
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_roster(file, filename):
+    """Yield one dict per row of a CSV or XLSX roster, keyed by lower-cased header."""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        sheet = load_workbook(file, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(cell or '').strip().lower() for cell in next(rows, [])]
+        for values in rows:
+            yield dict(zip(header, values))
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='') if isinstance(file.read(0), bytes) else file
+        reader = csv.DictReader(text)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        yield from reader
+
+
+def extract_photos(archive, directory):
+    """Extract the photos in a ZIP archive into `directory`, flattening any folders."""
+    with zipfile.ZipFile(archive) as photos:
+        for member in photos.infolist():
+            filename = os.path.basename(member.filename)
+            if member.is_dir() or not filename.lower().endswith(PHOTO_EXTENSIONS):
+                continue
+            with photos.open(member) as source, open(os.path.join(directory, filename), 'wb') as target:
+                shutil.copyfileobj(source, target)
+
+
+def _text(row, column):
+    value = row.get(column)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+class _Lookup:
+    """Case-insensitive name -> pk map for a lookup table, read from the lookup cache."""
+
+    def __init__(self, model, label):
+        self.label = label
+        self.ids = {name.casefold(): pk for pk, name in lookup_choices(model)}
+
+    def __call__(self, name):
+        if not name:
+            return None
+        try:
+            return self.ids[name.casefold()]
+        except KeyError:
+            raise RowError(f'Unknown {self.label} "{name}".')
+
+
+class AthleteImporter:
+    """Create or update athletes from roster rows, matched by name.
+
+    Lookup tables are read once up front, every row is validated before
+    anything is written, and writes go through bulk_create/bulk_update in
+    chunks inside a single transaction.
+    """
+
+    def __init__(self, default_country=None, photo_dir=None, chunk_size=500, today=None):
+        self.belts = _Lookup(Belt, 'belt')
+        self.countries = _Lookup(Country, 'country')
+        self.clubs = _Lookup(Club, 'club')
+        self.default_country = self.countries(default_country) if default_country else None
+        self.photo_dir = photo_dir
+        self.chunk_size = chunk_size
+        self.today = today or date.today()
+
+    def parse(self, row):
+        name = ' '.join(_text(row, 'name').split())
+        if not name:
+            raise RowError('Name is required.')
+
+        dob = row.get('dob')
+        if isinstance(dob, datetime):
+            dob = dob.date()
+        elif dob and not isinstance(dob, date):
+            try:
+                dob = date.fromisoformat(_text(row, 'dob'))
+            except ValueError:
+                raise RowError(f'Invalid date of birth "{_text(row, "dob")}" (use YYYY-MM-DD).')
+        if not dob:
+            age = _text(row, 'age')
+            if not age:
+                raise RowError('Either dob or age is required.')
+            try:
+                dob = birth_date_cutoff(self.today, int(float(age)))
+            except ValueError:
+                raise RowError(f'Invalid age "{age}".')
+
+        weight = _text(row, 'weight') or None
+        if weight is not None:
+            try:
+                weight = Decimal(weight).quantize(Decimal('0.01'))
+            except InvalidOperation:
+                raise RowError(f'Invalid weight "{weight}".')
+            if not 0 < weight <= MAX_WEIGHT:
+                raise RowError(f'Weight {weight} is out of range.')
+
+        gender = _text(row, 'gender')
+        if gender:
+            try:
+                gender = GENDERS[gender.casefold()]
+            except KeyError:
+                raise RowError(f'Unknown gender "{gender}".')
+
+        country = self.countries(_text(row, 'country')) or self.default_country
+        if country is None:
+            raise RowError('Country is required.')
+
+        return name, {
+            'dob': dob,
+            'weight': weight,
+            'belt_id': self.belts(_text(row, 'belt')),
+            'gender': gender or 'Male',
+            'country_id': country,
+            'region_id': self.clubs(_text(row, 'club')),
+            'passport': _text(row, 'passport') or None,
+            'id_passport_number': _text(row, 'id_passport_number') or None,
+            'email': _text(row, 'email') or None,
+            'contacts': _text(row, 'contacts') or None,
+        }
+
+    def find_photo(self, name):
+        if not self.photo_dir:
+            return None
+        slug = slugify(name)
+        for ext in PHOTO_EXTENSIONS:
+            path = os.path.join(self.photo_dir, slug + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def run(self, rows, dry_run=False):
+        report = ImportReport()
+        parsed = {}
+        columns = set()
+        for number, row in enumerate(rows, start=2):  # row 1 is the header
+            if not any(_text(row, column) for column in row):
+                continue
+            columns.update(column for column in row if column)
+            try:
+                name, values = self.parse(row)
+                if name.casefold() in parsed:
+                    raise RowError(f'Duplicate of row {parsed[name.casefold()][0]}.')
+            except RowError as e:
+                report.errors.append((number, _text(row, 'name'), str(e)))
+                continue
+            parsed[name.casefold()] = (number, name, values)
+
+        # Existing athletes only get the columns the file actually has, and
+        # rows that would not change anything are left alone.
+        update_fields = [name for name in UPDATE_FIELDS if UPDATE_COLUMNS.get(name, name) in columns]
+        attnames = [Athlete._meta.get_field(name).attname for name in update_fields]
+        existing = {
+            row[1].casefold(): (row[0], row[2:])
+            for row in Athlete.objects.values_list('pk', 'name', *attnames)
+        }
+        to_create = [(name, values) for key, (_, name, values) in parsed.items() if key not in existing]
+        matched, to_update = [], []
+        changes = {}  # changed fields -> athletes; bulk_update cost grows with fields x rows
+        for key, (_, name, values) in parsed.items():
+            if key in existing:
+                pk, current = existing[key]
+                matched.append((pk, name))
+                changed = tuple(
+                    field for field, attname, value in zip(update_fields, attnames, current)
+                    if values[attname] != value
+                )
+                if changed:
+                    to_update.append(pk)
+                    changes.setdefault(changed, []).append(Athlete(pk=pk, **values))
+        report.created, report.updated = len(to_create), len(to_update)
+        if dry_run:
+            return report
+
+        with transaction.atomic():
+            users = self.create_users([name for name, _ in to_create])
+            photo_names = {}
+            for start in range(0, len(to_create), self.chunk_size):
+                chunk = to_create[start:start + self.chunk_size]
+                Athlete.objects.bulk_create(
+                    [Athlete(user_id=users[name], name=name, **values) for name, values in chunk]
+                )
+                photo_names.update(
+                    Athlete.objects.filter(user_id__in=[users[name] for name, _ in chunk]).values_list('pk', 'name')
+                )
+            for fields, athletes in changes.items():
+                Athlete.objects.bulk_update(athletes, fields, batch_size=self.chunk_size)
+            photo_names.update(matched)
+            report.photos = self.attach_photos(photo_names)
+            transaction.on_commit(invalidate_dashboard_counts)
+            transaction.on_commit(invalidate_people_lists)
+        return report
+
+    def create_users(self, names):
+        """Create a login for every new athlete and return {name: user id}."""
+        taken = set(User.objects.filter(username__startswith='athlete-').values_list('username', flat=True))
+        usernames = {}
+        for name in names:
+            base = f'athlete-{slugify(name)}'[:140]
+            username, suffix = base, 2
+            while username in taken:
+                username, suffix = f'{base}-{suffix}', suffix + 1
+            taken.add(username)
+            usernames[username] = name
+        user_ids = {}
+        pending = list(usernames)
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            User.objects.bulk_create([User(username=username, password='!') for username in chunk])
+            # Re-read the ids: not every backend returns them from a bulk insert
+            for pk, username in User.objects.filter(username__in=chunk).values_list('pk', 'username'):
+                user_ids[usernames[username]] = pk
+        return user_ids
+
+    def attach_photos(self, names):
+        """Copy matching photos into storage for athletes without one, and queue their processing.
+
+        `names` maps athlete pk to the name used to look up the photo file.
+        """
+        from .tasks import queue_passport_photo
+
+        matches = {pk: path for pk, name in names.items() if (path := self.find_photo(name))}
+        athletes = []
+        pending = list(matches)
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            athletes.extend(Athlete.objects.filter(pk__in=chunk, passport_photo='').only('pk', 'name'))
+        for athlete in athletes:
+            with open(matches[athlete.pk], 'rb') as photo:
+                photo = File(photo)
+                upload_hash = file_sha256(photo)
+                athlete.passport_photo.name = default_storage.save(upload_to(athlete, matches[athlete.pk]), photo)
+            transaction.on_commit(
+                lambda athlete=athlete, upload_hash=upload_hash:
+                    queue_passport_photo(athlete, athlete.passport_photo.name, upload_hash)
+            )
+        Athlete.objects.bulk_update(athletes, ['passport_photo'], batch_size=self.chunk_size)
+        return len(athletes)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_THRESHOLD = 50
+DUPLICATES_LOGGED = 5
+
+_metrics = ContextVar('request_metrics', default=None)
+# Lists of placeholders vary with the number of ids, not with the query
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    """Short hash of a query's SQL with its parameters left out, the same for every repeat of it."""
+    return hashlib.sha1(_IN_LIST.sub('IN (...)', sql).encode()).hexdigest()[:12]
+
+
+class RequestMetrics:
+    """What one request spent on SQL and template rendering."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.statements = Counter()  # fingerprint -> executions
+        self.samples = {}  # fingerprint -> SQL
+        self._rendering = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: runs around every query, DEBUG or not
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            key = fingerprint(sql)
+            self.statements[key] += 1
+            self.samples.setdefault(key, sql)
+
+    def render(self, render):
+        """Time `render()`; templates rendered from inside it and the queries it runs are not counted twice."""
+        if self._rendering:
+            return render()
+        self._rendering += 1
+        started, db_before = time.perf_counter(), self.db_seconds
+        try:
+            return render()
+        finally:
+            self._rendering -= 1
+            self.render_seconds += time.perf_counter() - started - (self.db_seconds - db_before)
+
+    def duplicates(self):
+        return [
+            {'fingerprint': key, 'count': count, 'sql': self.samples[key][:300]}
+            for key, count in self.statements.most_common(DUPLICATES_LOGGED)
+            if count > 1
+        ]
+
+    def total_seconds(self):
+        return time.perf_counter() - self.started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for RequestMetricsMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        return metrics.render(lambda: super(TimedTemplate, self).render(context, request))
+
+
+class RequestMetricsMiddleware:
+    """Record per request the view, query count, duplicate queries, DB and render time.
+
+    Every request gets one log line on the ``main1.instrumentation`` logger
+    holding a JSON object; requests issuing more than
+    ``settings.QUERY_COUNT_THRESHOLD`` queries are logged as warnings with
+    ``"flagged": true``, which is how N+1 loops show up. Duplicate queries
+    are grouped by fingerprint (the SQL without its parameters), so a query
+    repeated once per row stands out with its count.
+
+    A ``Server-Timing`` header (db, render and app durations, visible in the
+    browser's network panel) is added when ``settings.SERVER_TIMING_HEADER``
+    is on and always for staff. Render time excludes the queries run by
+    lazy querysets while rendering; those count as db time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_COUNT_THRESHOLD', DEFAULT_QUERY_THRESHOLD)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', settings.DEBUG)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        total = metrics.total_seconds()
+
+        user = getattr(request, 'user', None)
+        if self.server_timing or (user is not None and user.is_staff):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries"',
+                f'render;dur={metrics.render_seconds * 1000:.1f}',
+                f'app;dur={total * 1000:.1f}',
+            ])
+        self.log(request, response, metrics, total)
+        return response
+
+    def log(self, request, response, metrics, total):
+        flagged = self.threshold is not None and metrics.queries > self.threshold
+        match = request.resolver_match
+        record = {
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'duplicate_queries': metrics.duplicates(),
+            'db_ms': round(metrics.db_seconds * 1000, 1),
+            'render_ms': round(metrics.render_seconds * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'flagged': flagged,
+        }
+        logger.log(logging.WARNING if flagged else logging.INFO, json.dumps(record), extra={'metrics': record})
@@ -0,0 +1,154 @@
+import smtplib
+import time
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.signing import BadSignature, SignatureExpired, Signer
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from .models import Coach, CoachInvitation, Tournament
+
+BATCH_SIZE = 50  # messages sent over one connection
+REGISTRATION_TOKEN_SALT = 'main1.registration'
+
+SUBJECT = 'Tournament Athlete Registration'
+BODY = """Dear {coach},
+
+The registration for the upcoming tournament '{tournament}' has begun.
+Please use the following link to register your athletes; it is personal to you,
+so there is no need to log in:
+{link}
+
+Best regards,
+The Tournament Team
+"""
+
+
+class DeliveryInterrupted(Exception):
+    """The mail server went away part way through a batch; `remaining` are the coach ids not yet tried."""
+
+    def __init__(self, remaining, error):
+        super().__init__(f'{len(remaining)} invitation(s) left unsent: {error}')
+        self.remaining = remaining
+
+
+def registration_token(tournament_id, coach_id, expires=None):
+    """Signed 'tournament:coach:expiry:signature' token of a coach's registration link.
+
+    `expires` is a Unix time, by default REGISTRATION_LINK_MAX_AGE seconds
+    from now; it is covered by the signature, so it cannot be extended.
+    """
+    if expires is None:
+        expires = int(time.time()) + settings.REGISTRATION_LINK_MAX_AGE
+    return Signer(salt=REGISTRATION_TOKEN_SALT).sign(f'{tournament_id}:{coach_id}:{expires}')
+
+
+def read_registration_token(token):
+    """(tournament id, coach id) from a registration token.
+
+    Raises django.core.signing.BadSignature if it was not issued by us and
+    SignatureExpired, a subclass, once it has expired.
+    """
+    value = Signer(salt=REGISTRATION_TOKEN_SALT).unsign(token)
+    parts = value.split(':')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise BadSignature(f'Malformed registration token {token!r}')
+    tournament_id, coach_id, expires = map(int, parts)
+    if time.time() > expires:
+        raise SignatureExpired(f'Registration token expired at {expires}')
+    return tournament_id, coach_id
+
+
+def registration_link(coach, tournament):
+    token = registration_token(tournament.id, coach.id)
+    return f"{settings.SITE_URL}{reverse('coach_registration', args=[token])}"
+
+
+def invitation_message(coach, tournament, connection=None):
+    return EmailMessage(
+        SUBJECT,
+        BODY.format(coach=coach.name, tournament=tournament.name, link=registration_link(coach, tournament)),
+        settings.DEFAULT_FROM_EMAIL,
+        [coach.email],
+        connection=connection,
+    )
+
+
+def prepare_invitations(tournament_id):
+    """Record an invitation for every coach with an email address; returns the ids of coaches not yet sent one."""
+    invited = CoachInvitation.objects.filter(tournament_id=tournament_id).values('coach_id')
+    coaches = Coach.objects.exclude(email__isnull=True).exclude(email='').exclude(pk__in=invited)
+    CoachInvitation.objects.bulk_create(
+        [
+            CoachInvitation(tournament_id=tournament_id, coach_id=pk, email=email)
+            for pk, email in coaches.values_list('pk', 'email')
+        ],
+        # Guards against a concurrent run where the backend allows it
+        ignore_conflicts=connections[CoachInvitation.objects.db].features.supports_ignore_conflicts,
+    )
+    return list(
+        CoachInvitation.objects.filter(tournament_id=tournament_id)
+        .exclude(status=CoachInvitation.SENT)
+        .order_by('coach_id')
+        .values_list('coach_id', flat=True)
+    )
+
+
+def batches(coach_ids, size=BATCH_SIZE):
+    for start in range(0, len(coach_ids), size):
+        yield coach_ids[start:start + size]
+
+
+def send_invitations(tournament_id, coach_ids):
+    """Email the coaches in `coach_ids` over a single connection, recording each delivery.
+
+    Addresses the server refuses are marked failed and skipped. If the
+    connection itself fails, the attempt is recorded against the coach it
+    happened on and DeliveryInterrupted is raised with the coaches still
+    to do, so the caller can retry them later. Returns (sent, failed).
+    """
+    tournament = Tournament.objects.get(pk=tournament_id)
+    invitations = list(
+        CoachInvitation.objects.filter(tournament_id=tournament_id, coach_id__in=coach_ids)
+        .exclude(status=CoachInvitation.SENT)
+        .select_related('coach')
+        .order_by('coach_id')
+    )
+    connection = get_connection()
+    attempted = []
+    sent = failed = 0
+    try:
+        connection.open()
+        for position, invitation in enumerate(invitations):
+            coach = invitation.coach
+            invitation.email = coach.email or ''
+            invitation.attempts += 1
+            attempted.append(invitation)
+            if not invitation.email:
+                invitation.status, invitation.error = CoachInvitation.FAILED, 'The coach has no email address.'
+                failed += 1
+                continue
+            try:
+                connection.send_messages([invitation_message(coach, tournament)])
+            except smtplib.SMTPRecipientsRefused as e:
+                invitation.status, invitation.error = CoachInvitation.FAILED, str(e)[:255]
+                failed += 1
+            except (smtplib.SMTPException, OSError) as e:
+                invitation.error = str(e)[:255]
+                raise DeliveryInterrupted([i.coach_id for i in invitations[position:]], e) from e
+            else:
+                invitation.status, invitation.error, invitation.sent_at = CoachInvitation.SENT, '', timezone.now()
+                sent += 1
+    except (smtplib.SMTPException, OSError) as e:
+        # Could not connect at all
+        raise DeliveryInterrupted([i.coach_id for i in invitations], e) from e
+    finally:
+        connection.close()
+        CoachInvitation.objects.bulk_update(attempted, ['email', 'status', 'attempts', 'error', 'sent_at'])
+    return sent, failed
+
+
+def give_up(tournament_id, coach_ids):
+    CoachInvitation.objects.filter(tournament_id=tournament_id, coach_id__in=coach_ids).exclude(
+        status=CoachInvitation.SENT,
+    ).update(status=CoachInvitation.FAILED)
@@ -0,0 +1,285 @@
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from importlib import import_module
+from types import SimpleNamespace
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http.cookie import parse_cookie
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15  # keeps proxies from closing idle streams
+RETRY_MILLISECONDS = 5000
+QUEUE_SIZE = 100
+REDIS_CHANNEL_PREFIX = 'tongmoodoo:live:'
+
+
+def _offer(queue, message):
+    # A viewer that stopped reading loses its oldest messages, not our memory
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+class LocalBroker:
+    """In-process pub/sub for live feeds.
+
+    Every subscriber is a bounded asyncio queue on the event loop it was
+    created on. publish() may be called from any thread (sync views and
+    on_commit hooks run in a worker thread under ASGI) and hands the message
+    to each subscriber's loop with call_soon_threadsafe. Only viewers
+    connected to the same process see the message; use RedisBroker when
+    running several processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> {(loop, queue), ...}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def add(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def remove(self, channel, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                pass  # the viewer's loop has shut down
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+
+class RedisBroker(LocalBroker):
+    """Pub/sub through Redis, so messages published by any web process or
+    Celery worker reach viewers connected to every process.
+
+    Each event loop keeps a single pattern subscription and fans messages out
+    to its local subscribers, so Redis sees one connection per process rather
+    than one per viewer.
+    """
+
+    def __init__(self, url):
+        import redis
+
+        super().__init__()
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self._listeners = {}  # loop -> listener task
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+
+    async def stop(self):
+        # Before the running loop is closed, so its listener is not left pending
+        listener = self._listeners.pop(asyncio.get_running_loop(), None)
+        if listener is not None:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    async def _listen(self):
+        import redis
+        import redis.asyncio
+
+        while True:
+            try:
+                client = redis.asyncio.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + '*')
+                    async for item in pubsub.listen():
+                        if item['type'] == 'pmessage':
+                            channel = item['channel'].decode()[len(REDIS_CHANNEL_PREFIX):]
+                            self.deliver(channel, item['data'].decode())
+            except redis.RedisError:
+                logger.warning('Live feed lost its Redis subscription, retrying', exc_info=True)
+                await asyncio.sleep(1)
+
+    def publish(self, channel, message):
+        import redis
+
+        try:
+            self.client.publish(REDIS_CHANNEL_PREFIX + channel, message)
+        except redis.RedisError:
+            # A scoreboard missing an update must not fail recording a result
+            logger.exception('Could not publish live feed message on %s', channel)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'LIVE_RESULTS_REDIS_URL', None)
+                _broker = RedisBroker(url) if url else LocalBroker()
+    return _broker
+
+
+def tournament_channel(tournament_id):
+    return f'tournament:{tournament_id}'
+
+
+def publish(tournament_id, event, data):
+    """Send `data` as a named SSE event to everyone watching the tournament.
+
+    The event is encoded once here rather than once per viewer.
+    """
+    message = f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+    get_broker().publish(tournament_channel(tournament_id), message)
+
+
+@contextlib.asynccontextmanager
+async def subscribe(channel):
+    broker = get_broker()
+    await broker.start()
+    subscriber = broker.add(channel)
+    try:
+        yield subscriber[1]
+    finally:
+        broker.remove(channel, subscriber)
+
+
+async def event_stream(tournament_id):
+    """Server-Sent Events for a tournament, with comment heartbeats while idle.
+
+    Waiting viewers are just parked coroutines: they hold no thread.
+    """
+    async with subscribe(tournament_channel(tournament_id)) as queue:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+
+
+def blocking_event_stream(tournament_id):
+    """event_stream() as a sync iterator, for WSGI servers.
+
+    The stream runs on an event loop of its own and holds the worker thread
+    for as long as the viewer stays connected, so production serves feeds
+    under ASGI (see LiveFeedApplication).
+    """
+    loop = asyncio.new_event_loop()
+    messages = event_stream(tournament_id)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(messages))
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(messages.aclose())
+        loop.run_until_complete(get_broker().stop())
+        loop.close()
+
+
+def _feed_status(session_key, tournament_id):
+    """HTTP status for a live feed request: 200, 403 without a login, 404 for an unknown tournament."""
+    from django.contrib.auth import get_user
+    from .models import Tournament
+
+    try:
+        session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        if not get_user(SimpleNamespace(session=session)).is_authenticated:
+            return 403
+        return 200 if Tournament.objects.filter(pk=tournament_id).exists() else 404
+    finally:
+        close_old_connections()
+
+
+class LiveFeedApplication:
+    """ASGI application that serves live feeds itself and hands every other request to Django.
+
+    Django runs the sync parts of each ASGI request (middleware, sessions,
+    the ORM) on a thread reserved for that request until its response is
+    finished, so a feed left open all day would park a thread per viewer.
+    Here the login and tournament are checked on a pooled thread that is
+    released straight away, and an idle viewer costs only a coroutine and
+    a queue.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        tournament_id = self.feed_tournament(scope)
+        if tournament_id is None:
+            return await self.application(scope, receive, send)
+
+        cookies = parse_cookie(dict(scope['headers']).get(b'cookie', b'').decode('latin-1'))
+        status = await sync_to_async(_feed_status, thread_sensitive=False)(
+            cookies.get(settings.SESSION_COOKIE_NAME), tournament_id,
+        )
+        if status != 200:
+            await send({'type': 'http.response.start', 'status': status, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        streaming = asyncio.ensure_future(self.stream(tournament_id, send))
+        disconnected = asyncio.ensure_future(self.disconnect(receive))
+        await asyncio.wait([streaming, disconnected], return_when=asyncio.FIRST_COMPLETED)
+        for task in (streaming, disconnected):
+            task.cancel()
+        # Let the stream unsubscribe before the connection is reported closed
+        await asyncio.wait([streaming, disconnected])
+
+    @staticmethod
+    def feed_tournament(scope):
+        if scope['type'] != 'http' or not scope['path'].endswith('/live/'):
+            return None
+        try:
+            match = resolve(scope['path'][len(scope.get('root_path', '')):])
+        except Resolver404:
+            return None
+        return match.kwargs['tournament_id'] if match.url_name == 'tournament_live_feed' else None
+
+    @staticmethod
+    async def stream(tournament_id, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        async with contextlib.aclosing(event_stream(tournament_id)) as messages:
+            async for message in messages:
+                await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+
+    @staticmethod
+    async def disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
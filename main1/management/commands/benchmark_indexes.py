@@ -0,0 +1,219 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+from main1.models import Athlete, Coach, Country, Tournament, TournamentParticipation
+
+ALIAS = 'index_benchmark'
+BATCH_SIZE = 5000
+# The indexes from migration 0010, dropped for the "before" run
+INDEXED_MODELS = (Athlete, Coach, Tournament, TournamentParticipation)
+INDEX_NAMES = {
+    'athlete_gender_idx', 'athlete_country_gender_idx', 'athlete_coach_active_idx',
+    'coach_gender_idx', 'coach_country_gender_idx',
+    'tournament_start_date_idx', 'participation_athlete_idx',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Build a synthetic SQLite database and compare query plans and timings of the hot '
+        'list/dashboard filters with and without the indexes added in migration 0010.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--athletes', type=int, default=100_000, help='Number of athletes (default: 100000).')
+        parser.add_argument('--coaches', type=int, default=2_000, help='Number of coaches (default: 2000).')
+        parser.add_argument('--countries', type=int, default=60, help='Number of countries (default: 60).')
+        parser.add_argument('--tournaments', type=int, default=500, help='Number of tournaments (default: 500).')
+        parser.add_argument('--entries', type=int, default=200, help='Athletes entered per tournament (default: 200).')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query; the median is shown (default: 20).')
+        parser.add_argument('--database', help='SQLite file to build (default: a temporary file, deleted afterwards).')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['athletes'] < 1 or options['coaches'] < 1 or options['countries'] < 1 or options['tournaments'] < 1:
+            raise CommandError('--athletes, --coaches, --countries and --tournaments must be positive.')
+        if options['entries'] > options['athletes']:
+            raise CommandError('--entries cannot be more than --athletes.')
+        path = options['database']
+        if path and os.path.exists(path):
+            raise CommandError(f'{path} already exists.')
+        if not path:
+            handle, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(handle)
+            os.remove(path)
+            cleanup = True
+        else:
+            cleanup = False
+
+        # A throwaway alias, so the benchmark never touches the configured databases
+        connections.settings[ALIAS] = connections.configure_settings({
+            'default': connections.settings['default'],
+            ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+        })[ALIAS]
+        try:
+            call_command('migrate', database=ALIAS, verbosity=0)
+            started = time.perf_counter()
+            sample = self.populate(random.Random(options['seed']), options)
+            self.stdout.write(f'Built {path} in {time.perf_counter() - started:.1f}s.')
+
+            queries = self.queries(sample)
+            self.set_indexes(False)
+            before = self.measure(queries, options['repeat'])
+            self.set_indexes(True)
+            after = self.measure(queries, options['repeat'])
+            self.report(queries, before, after)
+        finally:
+            connections[ALIAS].close()
+            del connections.settings[ALIAS]
+            if cleanup and os.path.exists(path):
+                os.remove(path)
+
+    def populate(self, rng, options):
+        """Fill the benchmark database; returns ids used by the queries."""
+        today = date.today()
+        Country.objects.using(ALIAS).bulk_create(
+            [Country(name=f'Country {n}') for n in range(options['countries'])], batch_size=BATCH_SIZE,
+        )
+        country_ids = list(Country.objects.using(ALIAS).values_list('pk', flat=True))
+
+        def users(prefix, count):
+            User.objects.using(ALIAS).bulk_create(
+                [User(username=f'{prefix}{n}') for n in range(count)], batch_size=BATCH_SIZE,
+            )
+            return list(
+                User.objects.using(ALIAS).filter(username__startswith=prefix).order_by('pk').values_list('pk', flat=True)
+            )
+
+        def profile(model, user_id, n):
+            return model(
+                user_id=user_id, name=f'{model.__name__} {n}', country_id=rng.choice(country_ids),
+                gender=rng.choices(['Male', 'Female'], [3, 2])[0],
+                dob=today - timedelta(days=rng.randint(6 * 365, 40 * 365)),
+            )
+
+        Coach.objects.using(ALIAS).bulk_create(
+            [profile(Coach, user_id, n) for n, user_id in enumerate(users('coach', options['coaches']))],
+            batch_size=BATCH_SIZE,
+        )
+        coach_ids = list(Coach.objects.using(ALIAS).values_list('pk', flat=True))
+        athletes = []
+        for n, user_id in enumerate(users('athlete', options['athletes'])):
+            athlete = profile(Athlete, user_id, n)
+            athlete.coach_id = rng.choice(coach_ids)
+            athlete.is_active = rng.random() < 0.9
+            athletes.append(athlete)
+        Athlete.objects.using(ALIAS).bulk_create(athletes, batch_size=BATCH_SIZE)
+        athlete_ids = list(Athlete.objects.using(ALIAS).values_list('pk', flat=True))
+
+        Tournament.objects.using(ALIAS).bulk_create([
+            Tournament(
+                name=f'Tournament {n}', edition=n + 1, location='Nairobi',
+                start_date=today + timedelta(days=7 * (n - options['tournaments'] + 20)),
+                end_date=today + timedelta(days=7 * (n - options['tournaments'] + 20) + 2),
+            )
+            for n in range(options['tournaments'])
+        ], batch_size=BATCH_SIZE)
+        tournament_ids = list(Tournament.objects.using(ALIAS).values_list('pk', flat=True))
+        TournamentParticipation.objects.using(ALIAS).bulk_create([
+            TournamentParticipation(tournament_id=tournament_id, athlete_id=athlete_id)
+            for tournament_id in tournament_ids
+            for athlete_id in rng.sample(athlete_ids, options['entries'])
+        ], batch_size=BATCH_SIZE)
+
+        participation = TournamentParticipation.objects.using(ALIAS).order_by('?').first()
+        return {
+            'coach': rng.choice(coach_ids),
+            'country': rng.choice(country_ids),
+            'tournament': participation.tournament_id,
+            'athlete': participation.athlete_id,
+            'today': today,
+        }
+
+    def queries(self, sample):
+        athletes = Athlete.objects.using(ALIAS)
+        return [
+            ("Coach's active athletes", lambda: list(
+                athletes.filter(coach_id=sample['coach'], is_active=True).values_list('pk', 'name')
+            )),
+            ('Athletes of one gender', lambda: athletes.filter(gender='Female').count()),
+            ('Coaches of one gender', lambda: Coach.objects.using(ALIAS).filter(gender='Female').count()),
+            ('Athletes by country and gender', lambda: athletes.filter(
+                country_id=sample['country'], gender='Female',
+            ).count()),
+            ('Athletes not yet entered', lambda: athletes.filter(
+                ~Q(tournamentparticipation__tournament=sample['tournament']), gender='Female',
+            ).count()),
+            ('Athlete already entered', lambda: TournamentParticipation.objects.using(ALIAS).filter(
+                tournament_id=sample['tournament'], athlete_id=sample['athlete'],
+            ).exists()),
+            ('Upcoming tournaments', lambda: list(
+                Tournament.objects.using(ALIAS).filter(start_date__gte=sample['today']).order_by('start_date')
+            )),
+        ]
+
+    def set_indexes(self, present):
+        connection = connections[ALIAS]
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if index.name not in INDEX_NAMES:
+                        continue
+                    if present:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def measure(self, queries, repeat):
+        """{label: (median milliseconds, query plan)} for each query."""
+        connection = connections[ALIAS]
+        results = {}
+        for label, run in queries:
+            run()  # warm the page cache
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = (statistics.median(timings), self.plan(connection, run))
+        return results
+
+    @staticmethod
+    def plan(connection, run):
+        # Explain the SQL the ORM actually ran, whatever shape count()/exists() gave it
+        connection.force_debug_cursor = True
+        try:
+            connection.queries_log.clear()
+            run()
+            sql = connection.queries_log[-1]['sql']
+        finally:
+            connection.force_debug_cursor = False
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def report(self, queries, before, after):
+        width = max(len(label) for label, _ in queries)
+        self.stdout.write('')
+        self.stdout.write(f"{'Query':<{width}}  {'Before ms':>10}  {'After ms':>10}  {'Speed-up':>8}")
+        for label, _ in queries:
+            slow, fast = before[label][0], after[label][0]
+            self.stdout.write(f'{label:<{width}}  {slow:>10.3f}  {fast:>10.3f}  {slow / fast if fast else 0:>7.1f}x')
+        for label, _ in queries:
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for heading, (_, plan) in (('before', before[label]), ('after', after[label])):
+                for line in plan:
+                    self.stdout.write(f'  {heading:<7}{line}')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Benchmark finished.'))
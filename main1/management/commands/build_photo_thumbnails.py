@@ -0,0 +1,41 @@
+import os
+from django.core.management.base import BaseCommand
+from PIL import Image
+from main1.models import (
+    Athlete, Coach, Media, PASSPORT_PHOTO_SIZE, PHOTO_DERIVATIVE_WIDTHS, Staff, file_sha256, photo_derivative_name,
+)
+from main1.tasks import process_passport_photo, write_photo_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate list-page thumbnails for passport photos that have none: photos uploaded before they '
+        'existed, and uploads whose processing could not be queued, which are normalized first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild thumbnails that already exist.')
+
+    def handle(self, *args, **options):
+        built = normalized = 0
+        for model in (Athlete, Coach, Staff, Media):
+            storage = model._meta.get_field('passport_photo').storage
+            photos = model.objects.exclude(passport_photo='').values_list('pk', 'passport_photo')
+            for pk, name in photos.iterator():
+                path = storage.path(name)
+                thumbnail = photo_derivative_name(path, PHOTO_DERIVATIVE_WIDTHS[0], 'jpg')
+                if not os.path.exists(path) or (os.path.exists(thumbnail) and not options['force']):
+                    continue
+                with Image.open(path) as image:
+                    if image.size == PASSPORT_PHOTO_SIZE:
+                        write_photo_derivatives(path, image)
+                        built += 1
+                        continue
+                # Still the original upload, which also writes the thumbnails
+                with storage.open(name, 'rb') as photo:
+                    upload_hash = file_sha256(photo)
+                process_passport_photo(model._meta.app_label, model._meta.model_name, pk, name, upload_hash)
+                normalized += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Built thumbnails for {built} photo(s) and normalized {normalized} unprocessed upload(s).'
+        ))
@@ -0,0 +1,108 @@
+import csv
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, F, OuterRef
+from django.utils.text import slugify
+from main1.models import Athlete, Coach, Tournament, TournamentParticipation
+
+FIELDNAMES = ['name', 'country', 'age', 'weight', 'belt', 'gender', 'category']
+
+
+class CsvRoster:
+    extension = 'csv'
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDNAMES)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxRoster:
+    extension = 'xlsx'
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = path
+        # write_only workbooks stream rows to disk instead of keeping cells in memory
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Roster')
+        self.sheet.append(FIELDNAMES)
+
+    def write(self, row):
+        self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+WRITERS = {'csv': CsvRoster, 'xlsx': XlsxRoster}
+
+
+class Command(BaseCommand):
+    help = 'Write one roster file per gender and weight division, including coaches who compete.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default='.', help='Directory for the roster files (default: current directory).')
+        parser.add_argument('--tournament', type=int, help='Only export competitors registered for this tournament id.')
+        parser.add_argument('--format', choices=sorted(WRITERS), default='csv', help='File format (default: csv).')
+        parser.add_argument('--min-age', type=int, default=18, help='Skip competitors younger than this (default: 18).')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        writer_class = WRITERS[options['format']]
+        if writer_class is XlsxRoster:
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                raise CommandError('XLSX export requires the openpyxl package.')
+
+        athletes = Athlete.objects.all()
+        coaches = Coach.objects.filter(is_athlete=True)
+        if options['tournament'] is not None:
+            tournament = Tournament.objects.filter(pk=options['tournament']).first()
+            if tournament is None:
+                raise CommandError(f"Tournament {options['tournament']} does not exist.")
+            registrations = TournamentParticipation.objects.filter(tournament=tournament)
+            athletes = athletes.filter(Exists(registrations.filter(athlete=OuterRef('pk'))))
+            coaches = coaches.filter(Exists(registrations.filter(coach=OuterRef('pk'), athlete__isnull=True)))
+
+        rows = self.roster_rows(athletes, options['min_age']).union(
+            self.roster_rows(coaches, options['min_age']), all=True,
+        ).order_by('gender', 'division', 'name')
+
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        writers = {}
+        try:
+            for name, country, age, weight, belt, gender, division in rows.iterator(chunk_size=options['chunk_size']):
+                key = ((gender or 'unknown').lower(), division)
+                writer = writers.get(key)
+                if writer is None:
+                    filename = f"{key[0]}_{slugify(division).replace('-', '_')}.{writer_class.extension}"
+                    writer = writers[key] = writer_class(os.path.join(output_dir, filename))
+                writer.write([name, country, age, weight, belt, gender, division])
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        for writer in writers.values():
+            self.stdout.write(f'Generated {os.path.basename(writer.path)}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(writers)} roster file(s) to {output_dir}.'))
+
+    @staticmethod
+    def roster_rows(queryset, min_age):
+        # Both halves of the UNION select the same annotated columns in the same order
+        return (
+            queryset.with_division()
+            .filter(current_age__gte=min_age)
+            .annotate(country_name=F('country__name'), belt_name=F('belt__name'))
+            .values_list('name', 'country_name', 'current_age', 'weight', 'belt_name', 'gender', 'division')
+        )
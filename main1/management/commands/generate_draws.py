@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from main1.draws import generate_draws
+from main1.models import Category, Tournament
+
+
+class Command(BaseCommand):
+    help = 'Seed single-elimination brackets for a tournament and store them as bouts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament', type=int, help='Tournament id.')
+        parser.add_argument('--category', help='Only redraw this category (e.g. sparring).')
+        parser.add_argument('--division', help='Only redraw this weight division.')
+        parser.add_argument('--seed', type=int, help='Random seed, to reproduce a draw.')
+
+    def handle(self, *args, **options):
+        tournament = Tournament.objects.filter(pk=options['tournament']).first()
+        if tournament is None:
+            raise CommandError(f"Tournament {options['tournament']} does not exist.")
+        category = None
+        if options['category']:
+            category = Category.objects.filter(name=options['category']).first()
+            if category is None:
+                raise CommandError(f"Category {options['category']} does not exist.")
+
+        brackets, bouts = generate_draws(
+            tournament, category=category, division=options['division'], seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Drew {brackets} bracket(s) with {bouts} bout(s).'))
@@ -0,0 +1,41 @@
+import csv
+import zipfile
+from django.core.management.base import BaseCommand, CommandError
+from main1.importers import AthleteImporter, read_roster
+
+
+class Command(BaseCommand):
+    help = 'Create or update athletes from a CSV or XLSX roster, matched by name.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='CSV or XLSX file with a header row.')
+        parser.add_argument('--country', help='Country for rows without a country column.')
+        parser.add_argument('--photos', help='Folder of photos named after the slugified athlete name.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per bulk insert/update (default: 500).')
+        parser.add_argument('--errors', help='Write the rows that failed validation to this CSV file.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the roster without saving anything.')
+
+    def handle(self, *args, **options):
+        try:
+            importer = AthleteImporter(
+                default_country=options['country'], photo_dir=options['photos'], chunk_size=options['chunk_size'],
+            )
+            with open(options['roster'], 'rb') as roster:
+                report = importer.run(read_roster(roster, options['roster']), dry_run=options['dry_run'])
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            raise CommandError(e)
+
+        for number, name, message in report.errors:
+            self.stderr.write(f'Row {number} ({name or "no name"}): {message}')
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as errors:
+                writer = csv.writer(errors)
+                writer.writerow(['row', 'name', 'error'])
+                writer.writerows(report.errors)
+
+        if options['dry_run']:
+            summary = f'Would create {report.created} and update {report.updated} athlete(s)'
+        else:
+            summary = (f'Created {report.created} and updated {report.updated} athlete(s), '
+                       f'attached {report.photos} photo(s)')
+        self.stdout.write(self.style.SUCCESS(f'{summary}; {report.failed} row(s) rejected.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from main1.tasks import prune_photo_cache
+
+
+class Command(BaseCommand):
+    help = 'Delete cached normalized passport photos that have not been used recently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Remove photos unused for this many days (default: 30).')
+        parser.add_argument('--dry-run', action='store_true', help='List the files that would be removed.')
+
+    def handle(self, *args, **options):
+        removed = prune_photo_cache(options['days'], dry_run=options['dry_run'])
+        for path in removed:
+            self.stdout.write(path)
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f'{action} {len(removed)} cached photo(s).'))
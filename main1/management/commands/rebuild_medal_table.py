@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from main1.models import Tournament
+from main1.results import rebuild_medal_table
+
+
+class Command(BaseCommand):
+    help = 'Recompute medal tables from participation placings, e.g. after placings were changed with queryset.update().'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournaments', nargs='*', type=int, help='Tournament ids (default: every tournament).')
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.all()
+        if options['tournaments']:
+            tournaments = tournaments.filter(pk__in=options['tournaments'])
+            missing = set(options['tournaments']) - set(tournaments.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Tournament(s) {', '.join(map(str, sorted(missing)))} do not exist.")
+        for tournament in tournaments:
+            countries = rebuild_medal_table(tournament)
+            self.stdout.write(f'{tournament.name}: {countries} countries with medals.')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(tournaments)} medal table(s).'))
@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from main1.badges import ROLE_COLOURS, collect_badges, sheet_grid, write_badge_pdf
+from main1.models import Tournament
+
+
+class Command(BaseCommand):
+    help = 'Render accreditation badges (photo, name, role band, country, QR code) onto printable A4 sheets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='PDF file to write.')
+        parser.add_argument('--tournament', type=int, help='Only athletes and coaches taking part in this tournament.')
+        parser.add_argument(
+            '--kinds', nargs='+', choices=list(ROLE_COLOURS), default=list(ROLE_COLOURS),
+            help='Kinds of badge to print (default: all).',
+        )
+        parser.add_argument('--columns', type=int, default=3, help='Badges across a sheet (default: 3).')
+        parser.add_argument('--rows', type=int, default=3, help='Badges down a sheet (default: 3).')
+        parser.add_argument('--workers', type=int, help='Rendering processes (default: one per CPU).')
+
+    def handle(self, *args, **options):
+        try:
+            sheet_grid(options['columns'], options['rows'])
+        except ValueError as e:
+            raise CommandError(e)
+        tournament = None
+        if options['tournament'] is not None:
+            tournament = Tournament.objects.filter(pk=options['tournament']).first()
+            if tournament is None:
+                raise CommandError(f"Tournament {options['tournament']} does not exist.")
+
+        started = time.perf_counter()
+        sheets = write_badge_pdf(
+            collect_badges(options['kinds'], tournament), options['output'],
+            columns=options['columns'], rows=options['rows'], max_workers=options['workers'],
+        )
+        if not sheets:
+            raise CommandError('Nobody to print a badge for.')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {sheets} sheet(s) to {options['output']} in {time.perf_counter() - started:.1f}s.",
+        ))
@@ -0,0 +1,52 @@
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from main1.models import Bout, Tournament
+from main1.scheduling import BOUT_MINUTES, DAY_END, DAY_START, REST_MINUTES, reschedule_after, schedule_tournament
+
+
+def _time(value):
+    return time.fromisoformat(value)
+
+
+class Command(BaseCommand):
+    help = "Assign a tournament's bouts to rings and start times, or push back bouts after an overrun."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament', type=int, help='Tournament id.')
+        parser.add_argument('--rings', type=int, default=4, help='Number of rings/mats (default: 4).')
+        parser.add_argument('--bout-minutes', type=int, default=BOUT_MINUTES)
+        parser.add_argument('--rest-minutes', type=int, default=REST_MINUTES,
+                            help="Minimum rest between an athlete's bouts.")
+        parser.add_argument('--day-start', type=_time, default=DAY_START, help='HH:MM')
+        parser.add_argument('--day-end', type=_time, default=DAY_END, help='HH:MM')
+        parser.add_argument('--overrun', type=int, metavar='BOUT_ID',
+                            help='Only reschedule the bouts affected by this bout running late.')
+        parser.add_argument('--finished-at', help='When the overrunning bout ended (YYYY-MM-DD HH:MM).')
+
+    def handle(self, *args, **options):
+        tournament = Tournament.objects.filter(pk=options['tournament']).first()
+        if tournament is None:
+            raise CommandError(f"Tournament {options['tournament']} does not exist.")
+        timing = {
+            'bout_minutes': options['bout_minutes'], 'rest_minutes': options['rest_minutes'],
+            'day_start': options['day_start'], 'day_end': options['day_end'],
+        }
+
+        if options['overrun'] is not None:
+            bout = Bout.objects.filter(pk=options['overrun'], tournament=tournament).first()
+            if bout is None:
+                raise CommandError(f"Bout {options['overrun']} is not part of this tournament.")
+            if not options['finished_at']:
+                raise CommandError('--finished-at is required with --overrun.')
+            finished_at = timezone.make_aware(datetime.fromisoformat(options['finished_at']))
+            moved, unscheduled = reschedule_after(bout, finished_at, **timing)
+            if unscheduled:
+                self.stdout.write(self.style.WARNING(f'{unscheduled} bout(s) no longer fit before {tournament.end_date}.'))
+            self.stdout.write(self.style.SUCCESS(f'Moved {moved} bout(s).'))
+            return
+
+        unscheduled = schedule_tournament(tournament, options['rings'], **timing)
+        if unscheduled:
+            self.stdout.write(self.style.WARNING(f'{unscheduled} bout(s) did not fit before {tournament.end_date}.'))
+        self.stdout.write(self.style.SUCCESS('Schedule updated.'))
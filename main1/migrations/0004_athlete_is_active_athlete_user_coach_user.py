@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import migrations, models
+
+
+def create_profile_users(apps, schema_editor):
+    # Every existing profile gets its own login (OneToOneField), with no
+    # usable password until an administrator sets one.
+    alias = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    for model_name in ('athlete', 'coach'):
+        Profile = apps.get_model('main1', model_name)
+        for profile in Profile.objects.using(alias).filter(user__isnull=True).only('pk'):
+            username = f'{model_name}-{profile.pk}'
+            while User.objects.using(alias).filter(username=username).exists():
+                username += '-1'
+            profile.user = User.objects.using(alias).create(username=username, password=make_password(None))
+            profile.save(update_fields=['user'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0003_tournament_alter_athlete_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='athlete',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        # Added nullable, filled with a user per profile, then made required:
+        # a single default user would break the one-to-one constraint.
+        migrations.AddField(
+            model_name='athlete',
+            name='user',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='coach',
+            name='user',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(create_profile_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='athlete',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='coach',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
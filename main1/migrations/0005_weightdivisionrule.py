@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0004_athlete_is_active_athlete_user_coach_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeightDivisionRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(choices=[('Male', 'Male'), ('Female', 'Female')], max_length=10)),
+                ('min_age', models.PositiveIntegerField()),
+                ('max_age', models.PositiveIntegerField()),
+                ('min_weight', models.FloatField(blank=True, null=True)),
+                ('min_weight_exclusive', models.BooleanField(default=False)),
+                ('max_weight', models.FloatField(blank=True, null=True)),
+                ('label', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['gender', 'min_age', 'min_weight'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_participations(apps, schema_editor):
+    # Keep the oldest row of every (tournament, athlete, category) group so
+    # the unique constraints below can be created.
+    TournamentParticipation = apps.get_model('main1', 'TournamentParticipation')
+    participations = TournamentParticipation.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        participations.filter(athlete__isnull=False)
+        .values('tournament', 'athlete', 'category')
+        .annotate(first=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        participations.filter(
+            tournament=group['tournament'], athlete=group['athlete'], category=group['category'],
+        ).exclude(id=group['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0005_weightdivisionrule'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_participations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tournamentparticipation',
+            constraint=models.UniqueConstraint(condition=models.Q(('athlete__isnull', False), ('category__isnull', False)), fields=('tournament', 'athlete', 'category'), name='unique_athlete_category_per_tournament'),
+        ),
+        migrations.AddConstraint(
+            model_name='tournamentparticipation',
+            constraint=models.UniqueConstraint(condition=models.Q(('athlete__isnull', False), ('category__isnull', True)), fields=('tournament', 'athlete'), name='unique_uncategorised_athlete_per_tournament'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0006_tournamentparticipation_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(max_length=10)),
+                ('division', models.CharField(max_length=100)),
+                ('round', models.PositiveSmallIntegerField()),
+                ('position', models.PositiveIntegerField()),
+                ('blue', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main1.tournamentparticipation')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='main1.category')),
+                ('red', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main1.tournamentparticipation')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bouts', to='main1.tournament')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bouts_won', to='main1.tournamentparticipation')),
+            ],
+            options={
+                'ordering': ['tournament', 'category', 'gender', 'division', 'round', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bout',
+            constraint=models.UniqueConstraint(fields=('tournament', 'category', 'gender', 'division', 'round', 'position'), name='unique_bout_slot'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0007_bout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bout',
+            name='ring',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bout',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bout',
+            index=models.Index(fields=['tournament', 'ring', 'scheduled_at'], name='main1_bout_tournam_630174_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0008_bout_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentparticipation',
+            name='placing',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, '1st'), (2, '2nd'), (3, '3rd')], null=True),
+        ),
+        migrations.CreateModel(
+            name='MedalTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gold', models.PositiveIntegerField(default=0)),
+                ('silver', models.PositiveIntegerField(default=0)),
+                ('bronze', models.PositiveIntegerField(default=0)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medal_tallies', to='main1.country')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medal_tallies', to='main1.tournament')),
+            ],
+            options={
+                'ordering': ['tournament', '-gold', '-silver', '-bronze', 'country__name'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='medaltally',
+            constraint=models.UniqueConstraint(fields=('tournament', 'country'), name='unique_medal_tally'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0009_medal_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['gender'], name='athlete_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['country', 'gender'], name='athlete_country_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['coach', 'is_active'], name='athlete_coach_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coach',
+            index=models.Index(fields=['gender'], name='coach_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coach',
+            index=models.Index(fields=['country', 'gender'], name='coach_country_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['start_date'], name='tournament_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentparticipation',
+            index=models.Index(fields=['tournament', 'athlete'], name='participation_athlete_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0010_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckIn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('athlete', 'Athlete'), ('coach', 'Coach'), ('staff', 'Staff'), ('media', 'Media')], max_length=10)),
+                ('profile_id', models.PositiveBigIntegerField()),
+                ('scanned_at', models.DateTimeField()),
+                ('accommodation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='check_ins', to='main1.accommodation')),
+                ('scanned_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_ins', to='main1.tournament')),
+            ],
+            options={
+                'ordering': ['-scanned_at'],
+                'indexes': [models.Index(fields=['tournament', 'accommodation'], name='checkin_location_idx')],
+            },
+        ),
+    ]
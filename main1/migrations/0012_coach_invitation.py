@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main1', '0011_check_in'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoachInvitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('coach', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invitations', to='main1.coach')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invitations', to='main1.tournament')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tournament', 'status'], name='invitation_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='coachinvitation',
+            constraint=models.UniqueConstraint(fields=('tournament', 'coach'), name='unique_coach_invitation'),
+        ),
+    ]
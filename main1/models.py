@@ -1,11 +1,14 @@
+import hashlib
+import io
 import os
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
 from django.utils.text import slugify
 from datetime import date
 from PIL import Image
 from django.utils import timezone
 from django.utils.html import format_html
 from django.contrib.auth.models import User
+from .divisions import age_expression, get_division_table
 
 # Helper Functions
 def upload_to(instance, filename):
@@ -13,7 +16,10 @@ def upload_to(instance, filename):
     filename = f"{slugify(instance.name)}.{ext}"
     return os.path.join(instance.get_upload_path(), filename)
 
-def process_image(image, target_size=(413, 531)):
+# Size of a normalized passport photo
+PASSPORT_PHOTO_SIZE = (413, 531)
+
+def process_image(image, target_size=PASSPORT_PHOTO_SIZE):
     img = Image.open(image)
     img = img.convert("RGB")
     img.thumbnail(target_size, Image.LANCZOS)
@@ -25,6 +31,53 @@ def process_image(image, target_size=(413, 531)):
     thumb.paste(img, img_position)
     return thumb
 
+# Thumbnail widths written next to every normalized passport photo, so list
+# pages can use srcset instead of the full-size image.
+PHOTO_DERIVATIVE_WIDTHS = (64, 160)
+PHOTO_DERIVATIVE_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+def photo_derivative_name(name, width, ext):
+    return f"{os.path.splitext(name)[0]}.{width}w.{ext}"
+
+def make_photo_derivatives(image, widths=PHOTO_DERIVATIVE_WIDTHS):
+    """Yield (width, ext, bytes) for each thumbnail of a normalized photo."""
+    image = image.convert("RGB")
+    for width in widths:
+        height = round(image.height * width / image.width)
+        thumb = image.resize((width, height), Image.LANCZOS)
+        for ext, image_format in PHOTO_DERIVATIVE_FORMATS:
+            output = io.BytesIO()
+            thumb.save(output, format=image_format, quality=80)
+            yield width, ext, output.getvalue()
+
+def file_sha256(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+class PassportPhotoModel(models.Model):
+    """Queues passport photo normalization when a new file is uploaded.
+
+    Saves that leave the photo alone never touch Pillow; the resize runs in
+    main1.tasks.process_passport_photo once the transaction commits.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        photo = self.passport_photo
+        new_upload = bool(photo) and not photo._committed
+        upload_hash = file_sha256(photo) if new_upload else None
+
+        super().save(*args, **kwargs)
+
+        if new_upload:
+            from .tasks import queue_passport_photo
+            name = self.passport_photo.name
+            transaction.on_commit(lambda: queue_passport_photo(self, name, upload_hash))
+
 # Models
 class Country(models.Model):
     name = models.CharField(max_length=100)
@@ -84,6 +137,9 @@ class Tournament(models.Model):
     end_date = models.DateField()
     location = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [models.Index(fields=['start_date'], name='tournament_start_date_idx')]
+
     def __str__(self):
         return format_html(
             '{} {}<sup>{}</sup> - Edition',
@@ -99,7 +155,35 @@ class Tournament(models.Model):
         else:
             suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
         return suffix
-class BaseProfile(models.Model):
+class WeightDivisionRule(models.Model):
+    GENDER_CHOICES = [
+        ('Male', 'Male'),
+        ('Female', 'Female'),
+    ]
+    gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
+    min_age = models.PositiveIntegerField()
+    max_age = models.PositiveIntegerField()
+    min_weight = models.FloatField(blank=True, null=True)
+    min_weight_exclusive = models.BooleanField(default=False)
+    max_weight = models.FloatField(blank=True, null=True)
+    label = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['gender', 'min_age', 'min_weight']
+
+    def __str__(self):
+        return f"{self.gender} {self.min_age}-{self.max_age}: {self.label}"
+
+class ProfileQuerySet(models.QuerySet):
+    def with_division(self, table=None, today=None):
+        """Annotate `current_age` and `division` in SQL so they can be filtered, grouped and ordered on."""
+        table = table or get_division_table()
+        return self.annotate(
+            current_age=age_expression(today),
+            division=table.as_expression(today),
+        )
+
+class BaseProfile(PassportPhotoModel):
     GENDER_CHOICES = [
         ('Male', 'Male'),
         ('Female', 'Female'),
@@ -134,9 +218,16 @@ class BaseProfile(models.Model):
     departure_date = models.DateField(default=date.today, blank=True, null=True)
     accommodation = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='%(class)s_accommodation', blank=True, null=True)
     joined_date = models.DateField(default=timezone.now)
-    
+
+    objects = ProfileQuerySet.as_manager()
+
     class Meta:
         abstract = True
+        # Dashboards and the gender/country lists filter on these
+        indexes = [
+            models.Index(fields=['gender'], name='%(class)s_gender_idx'),
+            models.Index(fields=['country', 'gender'], name='%(class)s_country_gender_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.country.name == "Kenya" and not self.region:
@@ -144,11 +235,6 @@ class BaseProfile(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Process and save the passport photo
-        if self.passport_photo:
-            image = process_image(self.passport_photo)
-            image.save(self.passport_photo.path)
-
     @property
     def age(self):
         today = date.today()
@@ -160,52 +246,7 @@ class BaseProfile(models.Model):
     
     @property
     def get_weight_category(self):
-        if self.gender.lower() == 'male':
-            if 18 <= self.age <= 35:
-                if self.weight <= 54.9:
-                    return 'Fin Weight Division'
-                elif 55 <= self.weight <= 59.9:
-                    return 'Fly Weight Division'
-                elif 60 <= self.weight <= 64.9:
-                    return 'Bantam Weight Division'
-                elif 65 <= self.weight <= 69.9:
-                    return 'Feather Weight Division'
-                elif 70 <= self.weight <= 74.9:
-                    return 'Light Weight Division'
-                elif 75 <= self.weight <= 79.9:
-                    return 'Welter Weight Division'
-                elif 80 <= self.weight <= 84.9:
-                    return 'Middle Weight Division'
-                elif 85 <= self.weight <= 89.9:
-                    return 'Heavy Weight Division'
-                elif 90 <= self.weight <= 100:
-                    return 'Super Heavy Weight Division'
-                elif self.weight > 100:
-                    return 'Super Heavy Weight Division Level 1'
-            elif 36 <= self.age <= 49:
-                if 50.9 <= self.weight <= 59.9:
-                    return 'Fly Weight Division'
-                elif 60 <= self.weight <= 69.9:
-                    return 'Middle Weight Division'
-                elif 70 <= self.weight <= 79.9:
-                    return 'Heavy Weight Division'
-                elif 80 <= self.weight <= 89.9:
-                    return 'Super Heavy Weight Division'
-                elif self.weight >= 90:
-                    return 'Super Heavy Weight Division Level 0'
-        elif self.gender.lower() == 'female':
-            if 18 <= self.age <= 49:
-                if 50.9 <= self.weight <= 59.9:
-                    return 'Fly Weight Division'
-                elif 60 <= self.weight <= 69.9:
-                    return 'Middle Weight Division'
-                elif 70 <= self.weight <= 79.9:
-                    return 'Heavy Weight Division'
-                elif 80 <= self.weight <= 89.9:
-                    return 'Super Heavy Weight Division'
-                elif self.weight >= 90:
-                    return 'Super Heavy Weight Division Level 0'
-        return 'Unknown Category'
+        return get_division_table().classify(self.gender, self.dob, self.weight)
 
 class Coach(BaseProfile):
     LEVEL_CHOICES = [
@@ -238,6 +279,11 @@ class Athlete(BaseProfile):
     teams = models.ManyToManyField('Team', related_name='athletes', blank=True)
     is_active = models.BooleanField(default=True)  # Add this field
 
+    class Meta(BaseProfile.Meta):
+        indexes = BaseProfile.Meta.indexes + [
+            # A coach's active athletes, on every coach dashboard
+            models.Index(fields=['coach', 'is_active'], name='athlete_coach_active_idx'),
+        ]
 
     def get_upload_path(self):
         return 'athlete_photos/'
@@ -247,17 +293,190 @@ class Athlete(BaseProfile):
     def __str__(self):
         return f"{self.name} - Athlete"
 
+class ParticipationQuerySet(models.QuerySet):
+    def register(self, tournament, athletes, coach=None, category=None):
+        """Register `athletes` for `tournament` in one transaction.
+
+        Returns (inserted, already_registered). Existing entries are found with
+        a single query and the rest are written with one bulk insert. The
+        unique constraints stop a concurrent registration of the same athlete
+        from entering them twice: where the backend supports ignore_conflicts
+        the duplicate insert is skipped, elsewhere (MSSQL) it raises
+        IntegrityError and the registration is retried once against the
+        entries now present.
+        """
+        athlete_ids = {athlete.pk for athlete in athletes}
+        for attempt in range(2):
+            try:
+                with transaction.atomic(using=self.db):
+                    existing = set(
+                        self.filter(tournament=tournament, category=category, athlete_id__in=athlete_ids)
+                        .values_list('athlete_id', flat=True)
+                    )
+                    new_ids = athlete_ids - existing
+                    self.bulk_create(
+                        [
+                            self.model(tournament=tournament, coach=coach, athlete_id=athlete_id, category=category)
+                            for athlete_id in sorted(new_ids)
+                        ],
+                        ignore_conflicts=connections[self.db].features.supports_ignore_conflicts,
+                    )
+                    if new_ids:
+                        # bulk_create sends no signals; the new entrants need badges that scan
+                        from .caching import CREDENTIALS, bump_cache_generation
+                        transaction.on_commit(lambda: bump_cache_generation(CREDENTIALS), using=self.db)
+                return len(new_ids), len(existing)
+            except IntegrityError:
+                if attempt:
+                    raise
+
 class TournamentParticipation(models.Model):
     tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE)
     coach = models.ForeignKey(Coach, on_delete=models.CASCADE, blank=True, null=True)
     athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, blank=True, null=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True)
     performance = models.CharField(max_length=255, blank=True, null=True)  # Performance details
+    PLACING_CHOICES = [(1, '1st'), (2, '2nd'), (3, '3rd')]
+    placing = models.PositiveSmallIntegerField(choices=PLACING_CHOICES, blank=True, null=True)  # Medal won in the division
 
+    objects = ParticipationQuerySet.as_manager()
+
+    class Meta:
+        # Two partial constraints because NULL categories compare differently
+        # across backends (SQL Server treats them as equal, SQLite does not).
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tournament', 'athlete', 'category'],
+                condition=models.Q(athlete__isnull=False, category__isnull=False),
+                name='unique_athlete_category_per_tournament',
+            ),
+            models.UniqueConstraint(
+                fields=['tournament', 'athlete'],
+                condition=models.Q(athlete__isnull=False, category__isnull=True),
+                name='unique_uncategorised_athlete_per_tournament',
+            ),
+        ]
+        # The partial unique indexes above only serve queries that also
+        # filter on category, so "is this athlete already registered"
+        # lookups get a plain one.
+        indexes = [models.Index(fields=['tournament', 'athlete'], name='participation_athlete_idx')]
 
     def __str__(self):
         return f"{self.tournament} - {self.coach or self.athlete} - {self.category}"
 
+class Bout(models.Model):
+    """One match of a single-elimination bracket.
+
+    A bracket is identified by (tournament, category, gender, division).
+    Round 1 is the opening round; the winner of bout `position` moves on to
+    bout `position // 2` of the next round, in the red corner when
+    `position` is even. A missing corner in round 1 is a bye.
+    """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='bouts')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True)
+    gender = models.CharField(max_length=10)
+    division = models.CharField(max_length=100)
+    round = models.PositiveSmallIntegerField()
+    position = models.PositiveIntegerField()
+    red = models.ForeignKey(TournamentParticipation, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    blue = models.ForeignKey(TournamentParticipation, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    winner = models.ForeignKey(TournamentParticipation, on_delete=models.SET_NULL, blank=True, null=True, related_name='bouts_won')
+    ring = models.PositiveSmallIntegerField(blank=True, null=True)
+    scheduled_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['tournament', 'category', 'gender', 'division', 'round', 'position']
+        indexes = [models.Index(fields=['tournament', 'ring', 'scheduled_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tournament', 'category', 'gender', 'division', 'round', 'position'],
+                name='unique_bout_slot',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.gender} {self.division} R{self.round} #{self.position + 1}"
+
+    @property
+    def is_walkover(self):
+        return self.round == 1 and (self.red_id is None) != (self.blue_id is None)
+
+
+class MedalTally(models.Model):
+    """Medals won by a country at a tournament.
+
+    A materialized view of TournamentParticipation.placing, kept up to date
+    by main1.results.adjust_medal_table whenever a placing changes.
+    """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='medal_tallies')
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='medal_tallies')
+    gold = models.PositiveIntegerField(default=0)
+    silver = models.PositiveIntegerField(default=0)
+    bronze = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['tournament', '-gold', '-silver', '-bronze', 'country__name']
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'country'], name='unique_medal_tally'),
+        ]
+
+    def __str__(self):
+        return f"{self.country}: {self.gold}/{self.silver}/{self.bronze}"
+
+    @property
+    def total(self):
+        return self.gold + self.silver + self.bronze
+
+
+class CheckIn(models.Model):
+    """A badge scanned at the arena (no accommodation) or at an accommodation.
+
+    Written in batches by main1.checkin; `profile_id` is the pk of the
+    Athlete, Coach, Staff or Media row named by `kind`.
+    """
+    KIND_CHOICES = [('athlete', 'Athlete'), ('coach', 'Coach'), ('staff', 'Staff'), ('media', 'Media')]
+
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='check_ins')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    profile_id = models.PositiveBigIntegerField()
+    accommodation = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='check_ins', blank=True, null=True)
+    scanned_at = models.DateTimeField()
+    scanned_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+
+    class Meta:
+        ordering = ['-scanned_at']
+        indexes = [models.Index(fields=['tournament', 'accommodation'], name='checkin_location_idx')]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.profile_id} at {self.accommodation or 'the arena'}"
+
+
+class CoachInvitation(models.Model):
+    """Delivery state of the email inviting a coach to register athletes for a tournament.
+
+    Created and updated by main1.invitations; `email` is the address the
+    last attempt went to and `error` why it failed.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='invitations')
+    coach = models.ForeignKey(Coach, on_delete=models.CASCADE, related_name='invitations')
+    email = models.EmailField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['tournament', 'coach'], name='unique_coach_invitation')]
+        indexes = [models.Index(fields=['tournament', 'status'], name='invitation_status_idx')]
+
+    def __str__(self):
+        return f"{self.coach.name} invited to {self.tournament.name} ({self.get_status_display()})"
+
 
 
 class Team(models.Model):
@@ -277,7 +496,7 @@ class Membership(models.Model):
     def __str__(self):
         return f"{self.athlete.name} in {self.team.name}"
 
-class Staff(models.Model):
+class Staff(PassportPhotoModel):
     GENDER_CHOICES = [
         ('Male', 'Male'),
         ('Female', 'Female'),
@@ -301,16 +520,10 @@ class Staff(models.Model):
     def get_upload_path(self):
         return 'staff_photos/'
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.passport_photo:
-            image = process_image(self.passport_photo)
-            image.save(self.passport_photo.path)
-
     def __str__(self):
         return self.name
 
-class Media(models.Model):
+class Media(PassportPhotoModel):
     ROLE_CHOICES = [
         ('Photographer', 'Photographer'),
         ('Journalist', 'Journalist'),
@@ -334,11 +547,5 @@ class Media(models.Model):
     def get_upload_path(self):
         return 'media_photos/'
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.passport_photo:
-            image = process_image(self.passport_photo)
-            image.save(self.passport_photo.path)
-
     def __str__(self):
         return self.name
@@ -0,0 +1,239 @@
+import glob
+import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pdfrw
+
+# Django is only imported lazily so pool workers can load this without settings.
+
+ANNOT_KEY = '/Annots'
+FIELD_KEY = '/T'
+PARENT_KEY = '/Parent'
+KIDS_KEY = '/Kids'
+FIELD_TYPE_KEY = '/FT'
+WIDGET_SUBTYPE = '/Widget'
+TEXT_FIELD = '/Tx'
+BUTTON_FIELD = '/Btn'
+
+
+class PdfFormTemplate:
+    """An AcroForm template parsed once and filled repeatedly.
+
+    Filling mirrors fillpdf.write_fillable_pdf for text fields and checkboxes,
+    but the field -> annotation index is built once, and every fill starts by
+    restoring the template's original values so the parsed document can be
+    reused.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        self.pdf = pdfrw.PdfReader(path)
+        self.lock = threading.Lock()
+        self.fields = {}
+        self.originals = []
+        for page in self.pdf.pages:
+            for annotation in page[ANNOT_KEY] or []:
+                if annotation['/Subtype'] != WIDGET_SUBTYPE:
+                    continue
+                target = annotation if annotation[FIELD_KEY] else annotation[PARENT_KEY]
+                if not target or not target[FIELD_KEY]:
+                    continue
+                key = target[FIELD_KEY][1:-1]
+                parent = target[PARENT_KEY]
+                while parent:
+                    key = parent[FIELD_KEY][1:-1] + '.' + key
+                    parent = parent[PARENT_KEY]
+                if target[FIELD_TYPE_KEY] in (TEXT_FIELD, BUTTON_FIELD) and key not in self.fields:
+                    self.fields[key] = target
+                    for obj in [target] + list(target[KIDS_KEY] or [])[:1]:
+                        self.originals.append((obj, obj['/V'], obj['/AS'], obj['/AP']))
+        if self.pdf.Root.AcroForm:
+            self.pdf.Root.AcroForm.update(pdfrw.PdfDict(NeedAppearances=pdfrw.PdfObject('true')))
+
+    def fill(self, data):
+        """Return the filled form as PDF bytes."""
+        output = io.BytesIO()
+        with self.lock:
+            for obj, value, state, appearance in self.originals:
+                obj.V, obj.AS, obj.AP = value, state, appearance
+            for key, value in data.items():
+                target = self.fields.get(key)
+                if target is None:
+                    continue
+                value = str(value)
+                if target[FIELD_TYPE_KEY] == BUTTON_FIELD:
+                    update = pdfrw.PdfDict(V=pdfrw.PdfName(value), AS=pdfrw.PdfName(value))
+                else:
+                    update = pdfrw.PdfDict(V=value, AP=value)
+                target.update(update)
+                if target[KIDS_KEY]:
+                    target[KIDS_KEY][0].update(update)
+            pdfrw.PdfWriter().write(output, self.pdf)
+        return output.getvalue()
+
+
+# Process-level registry of parsed templates, keyed by absolute path.
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(path):
+    """Return the parsed template for `path`, re-parsing it only when the file's mtime changes."""
+    path = os.path.abspath(path)
+    template = _templates.get(path)
+    if template is None or template.mtime != os.stat(path).st_mtime_ns:
+        with _templates_lock:
+            template = _templates.get(path)
+            if template is None or template.mtime != os.stat(path).st_mtime_ns:
+                template = _templates[path] = PdfFormTemplate(path)
+    return template
+
+
+def form_template_paths():
+    """The PDF forms shipped with the project: everything in media/doc plus the event forms."""
+    from django.conf import settings
+
+    paths = sorted(glob.glob(os.path.join(settings.MEDIA_ROOT, 'doc', '*.pdf')))
+    for name in ('dfx Rank Form.pdf', 'dfx Result Form.pdf', 'bantam Event Form.pdf'):
+        paths.append(os.path.join(settings.BASE_DIR, name))
+    return [path for path in paths if os.path.exists(path)]
+
+
+def preload_templates(paths=None):
+    for path in paths if paths is not None else form_template_paths():
+        get_template(path)
+
+
+def _fill_job(job):
+    path, name, data = job
+    return name, get_template(path).fill(data)
+
+
+# Web processes share one pool, created on first use, so concurrent
+# requests queue for the same workers instead of each starting its own.
+# Workers are started by a fork server rather than forked from the web
+# process, where another request thread may be holding a template's lock
+# that the child would inherit locked.
+FILL_WORKERS = min(4, os.cpu_count() or 1)
+_fill_pool = None
+_fill_pool_lock = threading.Lock()
+
+
+def _get_fill_pool():
+    global _fill_pool
+    with _fill_pool_lock:
+        if _fill_pool is None:
+            _fill_pool = ProcessPoolExecutor(
+                max_workers=FILL_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=preload_templates,
+                initargs=(form_template_paths(),),
+            )
+        return _fill_pool
+
+
+def _discard_fill_pool(pool):
+    # A worker died; the next caller gets a fresh pool
+    global _fill_pool
+    with _fill_pool_lock:
+        if _fill_pool is pool:
+            _fill_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def fill_many(path, jobs, window=16):
+    """Fill `path` once per (name, data) job in the shared process pool.
+
+    Yields (name, pdf_bytes) in job order. At most `window` results are in
+    flight per call, so memory stays bounded however many forms are
+    requested.
+    """
+    executor = _get_fill_pool()
+    pending = deque()
+    try:
+        for name, data in jobs:
+            pending.append(executor.submit(_fill_job, (path, name, data)))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        _discard_fill_pool(executor)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# The rank form is a page printed by the scoring software, not an AcroForm:
+# its sample content is cleared and our own written in the same font and
+# positions, keeping the page's rules.
+RANK_FORM = 'dfx Rank Form.pdf'
+RANK_FORM_FONT = 'cour'  # the template is set in Courier New
+RANK_FORM_FONT_SIZE = 10.2
+RANK_FORM_COLUMNS = (24, 78.6, 297, 367, 437, 507)  # left edge of each column
+RANK_FORM_RIGHT = 571.2
+RANK_FORM_SAMPLE_ROWS = (24, 163, 571.2, 188)  # the sample rows, their shading and closing rule
+RANK_FORM_HEADER_BASELINE = 156.6
+RANK_FORM_FIRST_BASELINE = 171.6
+RANK_FORM_ROW_PITCH = 10.2
+RANK_FORM_ROWS_PER_PAGE = 62
+RANK_FORM_STRIPE = (0.98, 0.98, 0.98)
+
+
+def _fit(text, width):
+    # Courier glyphs are 0.6em wide; keep a little space before the next column
+    limit = max(4, int(width / (RANK_FORM_FONT_SIZE * 0.6)) - 1)
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def fill_rank_form(path, title, subtitle, header, rows):
+    """Return the rank form at `path` as PDF bytes, listing `rows` under `header`.
+
+    The template's sample text, rows and bracket picture are redacted, and
+    the title, column headings, rows and page numbers are written in their
+    place. Rows that do not fit on one page continue on further copies of it.
+    """
+    import pymupdf
+
+    template = pymupdf.open(path)
+    blank = template[0]
+    for word in blank.get_text('words'):
+        blank.add_redact_annot(pymupdf.Rect(word[:4]))
+    for image in blank.get_image_info():
+        blank.add_redact_annot(pymupdf.Rect(image['bbox']))
+    blank.add_redact_annot(pymupdf.Rect(RANK_FORM_SAMPLE_ROWS))
+    blank.apply_redactions(
+        images=pymupdf.PDF_REDACT_IMAGE_REMOVE, graphics=pymupdf.PDF_REDACT_LINE_ART_REMOVE_IF_TOUCHED,
+    )
+
+    output = pymupdf.open()
+    pages = [rows[start:start + RANK_FORM_ROWS_PER_PAGE] for start in range(0, len(rows), RANK_FORM_ROWS_PER_PAGE)] or [[]]
+    widths = [right - left for left, right in zip(RANK_FORM_COLUMNS, RANK_FORM_COLUMNS[1:] + (RANK_FORM_RIGHT,))]
+    text = dict(fontname=RANK_FORM_FONT, fontsize=RANK_FORM_FONT_SIZE)
+    for number, page_rows in enumerate(pages, start=1):
+        output.insert_pdf(template)
+        page = output[-1]
+        for line, size, baseline in ((title, 14.4, 31.2), (subtitle, 12, 46.2)):
+            width = pymupdf.get_text_length(line, fontname=RANK_FORM_FONT, fontsize=size)
+            page.insert_text(((page.rect.width - width) / 2, baseline), line, fontname=RANK_FORM_FONT, fontsize=size)
+        for left, width, heading in zip(RANK_FORM_COLUMNS, widths, header):
+            page.insert_text((left, RANK_FORM_HEADER_BASELINE), _fit(str(heading), width), **text)
+        baseline = RANK_FORM_FIRST_BASELINE
+        for index, row in enumerate(page_rows):
+            baseline = RANK_FORM_FIRST_BASELINE + index * RANK_FORM_ROW_PITCH
+            if index % 2:
+                stripe = pymupdf.Rect(RANK_FORM_COLUMNS[0], baseline - 7.8, RANK_FORM_RIGHT, baseline + 2.4)
+                page.draw_rect(stripe, color=None, fill=RANK_FORM_STRIPE, overlay=False)
+            for left, width, value in zip(RANK_FORM_COLUMNS, widths, row):
+                page.insert_text((left, baseline), _fit(str(value), width), **text)
+        page.draw_line((RANK_FORM_COLUMNS[0], baseline + 5.4), (RANK_FORM_RIGHT, baseline + 5.4), width=0.6)
+        label = f'{number}/{len(pages)}'
+        width = pymupdf.get_text_length(label, **text)
+        page.insert_text((RANK_FORM_RIGHT - width, 824.4), label, **text)
+    return output.tobytes(garbage=3, deflate=True)
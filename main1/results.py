@@ -0,0 +1,171 @@
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce, Greatest
+from .live import publish
+from .models import Bout, MedalTally, TournamentParticipation
+
+MEDALS = {1: 'gold', 2: 'silver', 3: 'bronze'}
+
+
+def participant_name(participation):
+    """Name of whoever competes under `participation`: the athlete, or the coach entering themselves."""
+    if participation is None:
+        return ''
+    return (participation.athlete or participation.coach).name
+
+
+def bout_payload(bout):
+    """What the live feed sends about a bout."""
+    return {
+        'id': bout.pk,
+        'category': str(bout.category) if bout.category_id else '',
+        'gender': bout.gender,
+        'division': bout.division,
+        'round': bout.round,
+        'position': bout.position,
+        'ring': bout.ring,
+        'red': participant_name(bout.red),
+        'blue': participant_name(bout.blue),
+        'winner': participant_name(bout.winner),
+        'corner': 'red' if bout.winner_id and bout.winner_id == bout.red_id else 'blue' if bout.winner_id else None,
+    }
+
+
+def next_bout(bout):
+    """The bout the winner of `bout` moves on to, or None after the final."""
+    return Bout.objects.filter(
+        tournament_id=bout.tournament_id, category_id=bout.category_id, gender=bout.gender,
+        division=bout.division, round=bout.round + 1, position=bout.position // 2,
+    ).first()
+
+
+def record_bout_result(bout, winner):
+    """Record `winner`, a participation in one of the corners, as the winner of `bout`.
+
+    The winner takes their corner of the next-round bout, placings are set
+    when a final or semi-final is decided, and the live feed of the
+    tournament gets the result once the transaction commits. A result can be
+    corrected until the next-round bout has been decided.
+    """
+    if bout.red_id is None or bout.blue_id is None:
+        raise ValueError(f'{bout} is still waiting for a fighter.')
+    if winner is None or winner.pk not in (bout.red_id, bout.blue_id):
+        raise ValueError('The winner must be in the red or blue corner.')
+    loser = bout.blue if winner.pk == bout.red_id else bout.red
+    with transaction.atomic():
+        following = next_bout(bout)
+        if following is not None:
+            if following.winner_id is not None:
+                raise ValueError(f'{following} has already been decided.')
+            corner = 'red' if bout.position % 2 == 0 else 'blue'
+            setattr(following, corner, winner)
+            following.save(update_fields=[corner])
+        bout.winner = winner
+        bout.save(update_fields=['winner'])
+        # Medals come from the last two rounds: both semi-final losers take bronze
+        if following is None:
+            set_placings({winner: 1, loser: 2})
+        elif next_bout(following) is None:
+            set_placings({winner: None, loser: 3})
+        payload = bout_payload(bout)
+        transaction.on_commit(lambda: publish(bout.tournament_id, 'bout', payload))
+    return following
+
+
+def set_placings(placings):
+    """Save {participation: placing} for the participations whose placing changes."""
+    for participation, placing in placings.items():
+        if participation.placing != placing:
+            participation.placing = placing
+            participation.save(update_fields=['placing'])
+
+
+def stored_medal(participation_id):
+    """(tournament id, country id, placing) of a saved participation with a placing, else None."""
+    return (
+        TournamentParticipation.objects.filter(pk=participation_id, placing__isnull=False)
+        .values_list('tournament_id', Coalesce('athlete__country_id', 'coach__country_id'), 'placing')
+        .first()
+    )
+
+
+def participation_medal(participation):
+    """(tournament id, country id, placing) for `participation` as it is in memory, else None."""
+    if participation.placing is None:
+        return None
+    competitor = participation.athlete or participation.coach
+    return participation.tournament_id, competitor and competitor.country_id, participation.placing
+
+
+def adjust_medal_table(removed=(), added=()):
+    """Apply changed placings to the medal table.
+
+    `removed` and `added` hold (tournament id, country id, placing) for
+    placings taken away and awarded (None entries are ignored). Only the
+    affected tally rows are touched, with one UPDATE each, and the new table
+    is published to the tournament's live feed once the transaction commits.
+    """
+    deltas = Counter()
+    for medals, sign in ((removed, -1), (added, 1)):
+        for medal in medals:
+            if medal is not None and medal[1] is not None and medal[2] in MEDALS:
+                deltas[medal[0], medal[1], MEDALS[medal[2]]] += sign
+    rows = {}
+    for (tournament_id, country_id, column), delta in deltas.items():
+        if delta:
+            rows.setdefault((tournament_id, country_id), {})[column] = delta
+
+    for (tournament_id, country_id), changes in rows.items():
+        tallies = MedalTally.objects.filter(tournament_id=tournament_id, country_id=country_id)
+        update = {column: Greatest(F(column) + delta, 0) for column, delta in changes.items()}
+        if not tallies.update(**update):
+            if all(delta < 0 for delta in changes.values()):
+                continue  # nothing to take away, e.g. the tournament is being deleted
+            try:
+                with transaction.atomic():
+                    MedalTally.objects.create(
+                        tournament_id=tournament_id, country_id=country_id,
+                        **{column: max(delta, 0) for column, delta in changes.items()},
+                    )
+            except IntegrityError:
+                tallies.update(**update)  # another request created the row first
+    for tournament_id in {tournament_id for tournament_id, _ in rows}:
+        transaction.on_commit(lambda tournament_id=tournament_id: publish(
+            tournament_id, 'medals', medal_table(tournament_id),
+        ))
+
+
+def rebuild_medal_table(tournament):
+    """Recompute the medal table of `tournament` (an instance or id) from its placings."""
+    tournament_id = getattr(tournament, 'pk', tournament)
+    counts = (
+        TournamentParticipation.objects.filter(tournament=tournament, placing__isnull=False)
+        .annotate(country_id=Coalesce('athlete__country_id', 'coach__country_id'))
+        .filter(country_id__isnull=False)
+        .values('country_id')
+        .annotate(**{column: Count('pk', filter=Q(placing=placing)) for placing, column in MEDALS.items()})
+    )
+    with transaction.atomic():
+        MedalTally.objects.filter(tournament=tournament).delete()
+        MedalTally.objects.bulk_create([MedalTally(tournament_id=tournament_id, **row) for row in counts])
+    return len(counts)
+
+
+def medal_table(tournament):
+    """The medal table of `tournament`, best country first; equal tallies share a rank."""
+    tallies = (
+        MedalTally.objects.filter(tournament=tournament)
+        .exclude(gold=0, silver=0, bronze=0)
+        .values_list('country__name', 'gold', 'silver', 'bronze')
+    )
+    table = []
+    previous = None
+    for number, (country, gold, silver, bronze) in enumerate(tallies, start=1):
+        if (gold, silver, bronze) != previous:
+            rank, previous = number, (gold, silver, bronze)
+        table.append({
+            'rank': rank, 'country': country,
+            'gold': gold, 'silver': silver, 'bronze': bronze, 'total': gold + silver + bronze,
+        })
+    return table
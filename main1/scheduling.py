@@ -0,0 +1,269 @@
+import heapq
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.utils import timezone
+
+BOUT_MINUTES = 6
+REST_MINUTES = 20
+DAY_START = time(9, 0)
+DAY_END = time(18, 0)
+
+# What the scheduler needs to know about a bout; `people` are the athletes or
+# coaches already known to fight in it, used to keep their rest periods.
+ScheduleBout = namedtuple('ScheduleBout', ['id', 'bracket', 'round', 'position', 'people', 'walkover'])
+
+
+class Timetable:
+    """Competition days and session hours, with bouts fitted inside them."""
+
+    def __init__(self, first_day, last_day, bout_minutes=BOUT_MINUTES, rest_minutes=REST_MINUTES,
+                 day_start=DAY_START, day_end=DAY_END):
+        self.first_day = first_day
+        self.last_day = last_day
+        self.length = timedelta(minutes=bout_minutes)
+        self.rest = timedelta(minutes=rest_minutes)
+        self.day_start = day_start
+        self.day_end = day_end
+
+    def at(self, day, moment):
+        return timezone.make_aware(datetime.combine(day, moment))
+
+    @property
+    def opening(self):
+        return self.at(self.first_day, self.day_start)
+
+    def fit(self, start):
+        """Earliest time at or after `start` when a whole bout fits in a session, or None."""
+        day = timezone.localtime(start).date()
+        if start < self.at(day, self.day_start):
+            start = self.at(day, self.day_start)
+        if start + self.length > self.at(day, self.day_end):
+            day += timedelta(days=1)
+            start = self.at(day, self.day_start)
+        if day > self.last_day:
+            return None
+        return start
+
+
+def _feeders(bout):
+    return (bout.bracket, bout.round - 1, 2 * bout.position), (bout.bracket, bout.round - 1, 2 * bout.position + 1)
+
+
+def _parent(bout):
+    return bout.bracket, bout.round + 1, bout.position // 2
+
+
+def schedule(bouts, rings, timetable):
+    """Assign bouts to rings and start times.
+
+    Greedy list scheduling: the ring that frees up first takes the bout that
+    can start soonest, preferring the bracket it is already running, then a
+    bracket no other ring has claimed. A bout becomes ready once both of its
+    feeder bouts are scheduled and may start only after their end plus the
+    rest period; people already known to fight in it also get their rest.
+    Walkovers take no ring time. Returns ({bout id: (ring, start)},
+    [bout ids that did not fit before the last day ended]).
+    """
+    by_slot = {(b.bracket, b.round, b.position): b for b in bouts}
+    ready_at = {}
+    waiting = {}
+    queues = {}  # bracket -> heap of (ready time, round, position, id)
+    people_free = {}
+    assigned = {}
+
+    def finish(bout, end):
+        parent = by_slot.get(_parent(bout))
+        if parent is None:
+            return
+        ready_at[parent.id] = max(ready_at.get(parent.id, timetable.opening), end)
+        waiting[parent.id] -= 1
+        if waiting[parent.id] == 0:
+            enqueue(parent)
+
+    def enqueue(bout):
+        start = ready_at.get(bout.id, timetable.opening)
+        for person in bout.people:
+            start = max(start, people_free.get(person, start))
+        heapq.heappush(queues.setdefault(bout.bracket, []), (start, bout.round, bout.position, bout.id))
+
+    ids = {b.id: b for b in bouts}
+    for bout in bouts:
+        waiting[bout.id] = sum(1 for slot in _feeders(bout) if slot in by_slot) if bout.round > 1 else 0
+    # Walkovers are decided already, so their parent bouts do not wait on them
+    for bout in bouts:
+        parent = by_slot.get(_parent(bout))
+        if bout.walkover and parent is not None:
+            waiting[parent.id] -= 1
+    for bout in bouts:
+        if waiting[bout.id] == 0 and not bout.walkover:
+            enqueue(bout)
+
+    free_rings = [(timetable.opening, ring) for ring in range(1, rings + 1)]
+    heapq.heapify(free_rings)
+    running = {}  # ring -> bracket
+    owner = {}  # bracket -> ring
+    while free_rings:
+        free, ring = heapq.heappop(free_rings)
+        candidates = [
+            bracket for bracket, queue in queues.items()
+            if queue and owner.get(bracket, ring) == ring
+        ] or [bracket for bracket, queue in queues.items() if queue]
+        if not candidates:
+            continue  # nothing left for this ring; other rings may still release bouts
+        bracket = min(
+            candidates,
+            key=lambda b: (max(free, queues[b][0][0]), running.get(ring) != b, str(b)),
+        )
+        ready, round_number, position, bout_id = heapq.heappop(queues[bracket])
+        bout = ids[bout_id]
+        rested = max([ready] + [people_free.get(person, ready) for person in bout.people])
+        if rested > ready:
+            # One of its fighters was given another bout since it was queued
+            heapq.heappush(queues[bracket], (rested, round_number, position, bout_id))
+            heapq.heappush(free_rings, (free, ring))
+            continue
+        start = timetable.fit(max(free, ready))
+        if start is None:
+            # Out of days: this bout and everything after it stay unscheduled
+            heapq.heappush(free_rings, (free, ring))
+            continue
+        previous = running.get(ring)
+        if previous != bracket:
+            if owner.get(previous) == ring:
+                del owner[previous]
+            running[ring] = bracket
+            owner[bracket] = ring
+        end = start + timetable.length
+        assigned[bout.id] = (ring, start)
+        for person in bout.people:
+            people_free[person] = end + timetable.rest
+        finish(bout, end + timetable.rest)
+        heapq.heappush(free_rings, (end, ring))
+
+    unscheduled = [b.id for b in bouts if not b.walkover and b.id not in assigned]
+    return assigned, unscheduled
+
+
+def _load(tournament):
+    """The tournament's bouts as ScheduleBouts, plus {bout id: (ring, start)} as stored."""
+    from .models import Bout
+
+    rows = Bout.objects.filter(tournament=tournament).values_list(
+        'pk', 'category_id', 'gender', 'division', 'round', 'position',
+        'red_id', 'red__athlete_id', 'red__coach_id', 'blue_id', 'blue__athlete_id', 'blue__coach_id',
+        'ring', 'scheduled_at',
+    )
+    bouts, slots = [], {}
+    for (pk, category_id, gender, division, round_number, position,
+         red, red_athlete, red_coach, blue, blue_athlete, blue_coach, ring, scheduled_at) in rows:
+        people = tuple(
+            ('athlete', athlete) if athlete else ('coach', coach)
+            for participation, athlete, coach in ((red, red_athlete, red_coach), (blue, blue_athlete, blue_coach))
+            if participation
+        )
+        walkover = round_number == 1 and (red is None) != (blue is None)
+        bouts.append(ScheduleBout(pk, (category_id, gender, division), round_number, position, people, walkover))
+        slots[pk] = (ring, scheduled_at)
+    return bouts, slots
+
+
+def schedule_tournament(tournament, rings, **options):
+    """Lay out every bout of `tournament` over its days; returns the number left unscheduled."""
+    from .models import Bout
+
+    timetable = Timetable(tournament.start_date, tournament.end_date, **options)
+    bouts, _ = _load(tournament)
+    assigned, unscheduled = schedule(bouts, rings, timetable)
+    updates = []
+    for bout in bouts:
+        ring, start = assigned.get(bout.id, (None, None))
+        updates.append(Bout(pk=bout.id, ring=ring, scheduled_at=start))
+    with transaction.atomic():
+        Bout.objects.bulk_update(updates, ['ring', 'scheduled_at'], batch_size=500)
+    return len(unscheduled)
+
+
+def reschedule_after(bout, finished_at, **options):
+    """Push back the bouts affected by `bout` ending at `finished_at`.
+
+    Only bouts that actually move are touched: the ones after it on the same
+    ring, and the bouts its fighters move on to, followed transitively until
+    the delay is absorbed by idle time. Nothing is moved earlier than planned,
+    and bouts pushed past the last day are unscheduled. Returns (moved,
+    unscheduled) counts.
+    """
+    from .models import Bout
+
+    tournament = bout.tournament
+    timetable = Timetable(tournament.start_date, tournament.end_date, **options)
+    bouts, slots = _load(tournament)
+    by_id = {b.id: b for b in bouts}
+    by_slot = {(b.bracket, b.round, b.position): b for b in bouts}
+    rings = {}
+    for b in bouts:
+        ring, start = slots[b.id]
+        if ring is not None and start is not None:
+            rings.setdefault(ring, []).append((start, b.id))
+    after = {}  # bout id -> next bout on the same ring
+    for sequence in rings.values():
+        sequence.sort()
+        for (_, current), (_, following) in zip(sequence, sequence[1:]):
+            after[current] = following
+    before = {following: current for current, following in after.items()}
+
+    ends = {b.id: slots[b.id][1] + timetable.length for b in bouts if slots[b.id][1] is not None}
+    ends[bout.pk] = finished_at
+    moved = {}
+    pending = []
+
+    def follow(bout_id):
+        for dependent in (after.get(bout_id), getattr(by_slot.get(_parent(by_id[bout_id])), 'id', None)):
+            if dependent is not None and slots[dependent][1] is not None:
+                heapq.heappush(pending, (slots[dependent][1], dependent))
+
+    follow(bout.pk)
+    while pending:
+        _, bout_id = heapq.heappop(pending)
+        if bout_id in moved and moved[bout_id] is None:
+            continue
+        current = moved.get(bout_id, slots[bout_id][1])
+        earliest = slots[bout_id][1]
+        if before.get(bout_id) in ends:
+            earliest = max(earliest, ends[before[bout_id]])
+        start = earliest
+        for slot in _feeders(by_id[bout_id]) if by_id[bout_id].round > 1 else ():
+            feeder = by_slot.get(slot)
+            if feeder is None:
+                continue
+            if feeder.id in moved and moved[feeder.id] is None:
+                start = None  # its fighters come from a bout that no longer fits
+                break
+            if feeder.id in ends:
+                earliest = max(earliest, ends[feeder.id] + timetable.rest)
+        if start is not None:
+            start = timetable.fit(earliest)
+        if start is None:
+            # Pushed past the last day: unschedule it, along with the bouts it feeds
+            moved[bout_id] = None
+            ends.pop(bout_id, None)
+            follow(bout_id)
+            continue
+        if start <= current:
+            continue
+        moved[bout_id] = start
+        ends[bout_id] = start + timetable.length
+        follow(bout_id)
+
+    with transaction.atomic():
+        Bout.objects.bulk_update(
+            [
+                Bout(pk=pk, ring=slots[pk][0] if start else None, scheduled_at=start)
+                for pk, start in moved.items()
+            ],
+            ['ring', 'scheduled_at'], batch_size=500,
+        )
+    return (
+        sum(1 for start in moved.values() if start is not None),
+        sum(1 for start in moved.values() if start is None),
+    )
@@ -0,0 +1,78 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import (
+    Accommodation, Athlete, Belt, Category, Club, Coach, Country, Media, Staff, Tournament, TournamentParticipation,
+    WeightDivisionRule,
+)
+from .caching import CREDENTIALS, TOURNAMENT_LIST, bump_cache_generation, invalidate_lookup, invalidate_people_lists
+from .divisions import reset_division_table
+from .results import adjust_medal_table, participation_medal, stored_medal
+from .stats import invalidate_dashboard_counts
+
+# Saving any of these can move a participation's medal to another tournament or country
+MEDAL_FIELDS = {'tournament', 'athlete', 'coach', 'placing'}
+# Participation fields that decide who is accredited for a tournament
+CREDENTIAL_FIELDS = {'tournament', 'athlete', 'coach'}
+
+
+@receiver([post_save, post_delete], sender=WeightDivisionRule)
+def invalidate_division_table(sender, **kwargs):
+    reset_division_table()
+    invalidate_people_lists()
+
+
+@receiver([post_save, post_delete], sender=Athlete)
+@receiver([post_save, post_delete], sender=Coach)
+def invalidate_dashboard(sender, **kwargs):
+    invalidate_dashboard_counts()
+    invalidate_people_lists()
+
+
+@receiver([post_save, post_delete], sender=Country)
+@receiver([post_save, post_delete], sender=Belt)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Club)
+def invalidate_lookups(sender, **kwargs):
+    invalidate_lookup(sender)
+    invalidate_people_lists()  # the lists show country, club and belt names
+
+
+@receiver([post_save, post_delete], sender=Accommodation)
+def invalidate_accommodation(sender, **kwargs):
+    invalidate_people_lists()
+
+
+@receiver([post_save, post_delete], sender=Tournament)
+def invalidate_tournament_list(sender, **kwargs):
+    bump_cache_generation(TOURNAMENT_LIST)
+
+
+@receiver([post_save, post_delete], sender=Athlete)
+@receiver([post_save, post_delete], sender=Coach)
+@receiver([post_save, post_delete], sender=Staff)
+@receiver([post_save, post_delete], sender=Media)
+@receiver([post_save, post_delete], sender=Accommodation)
+@receiver([post_save, post_delete], sender=TournamentParticipation)
+def invalidate_credentials(sender, update_fields=None, **kwargs):
+    # Recording placings saves participations too, without changing who is accredited
+    if sender is TournamentParticipation and update_fields and not CREDENTIAL_FIELDS.intersection(update_fields):
+        return
+    bump_cache_generation(CREDENTIALS)
+
+
+@receiver(pre_save, sender=TournamentParticipation)
+@receiver(pre_delete, sender=TournamentParticipation)
+def remember_medal(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._medal_tracked = not raw and (update_fields is None or bool(MEDAL_FIELDS.intersection(update_fields)))
+    instance._stored_medal = stored_medal(instance.pk) if instance._medal_tracked and instance.pk else None
+
+
+@receiver(post_save, sender=TournamentParticipation)
+def update_medal_table(sender, instance, **kwargs):
+    if getattr(instance, '_medal_tracked', False):
+        adjust_medal_table(removed=[instance._stored_medal], added=[participation_medal(instance)])
+
+
+@receiver(post_delete, sender=TournamentParticipation)
+def remove_medal(sender, instance, **kwargs):
+    adjust_medal_table(removed=[getattr(instance, '_stored_medal', None)])
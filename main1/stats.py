@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .caching import bump_cache_generation, cache_generation
+from .models import Athlete, Coach
+
+# Dashboard counters are cached under a generation number that is bumped by
+# the Athlete/Coach save and delete signals, which drops every cached
+# dashboard at once (including the coach a moved athlete used to belong to).
+DASHBOARD = 'dashboard'
+DASHBOARD_TIMEOUT = 60 * 10
+
+
+def _dashboard_key(name):
+    return f'{DASHBOARD}:{cache_generation(DASHBOARD)}:{name}'
+
+
+def invalidate_dashboard_counts():
+    bump_cache_generation(DASHBOARD)
+
+
+def admin_dashboard_counts():
+    key = _dashboard_key('admin')
+    counts = cache.get(key)
+    if counts is None:
+        coaches = Coach.objects.aggregate(
+            total=Count('id'),
+            males=Count('id', filter=Q(gender='Male')),
+            females=Count('id', filter=Q(gender='Female')),
+            athletes=Count('id', filter=Q(is_athlete=True)),
+        )
+        athletes = Athlete.objects.aggregate(
+            total=Count('id'),
+            males=Count('id', filter=Q(gender='Male')),
+            females=Count('id', filter=Q(gender='Female')),
+            countries=Count('country', distinct=True),
+        )
+        counts = {
+            'total_males': coaches['males'] + athletes['males'],
+            'total_females': coaches['females'] + athletes['females'],
+            'total_coaches': coaches['total'],
+            # Include coaches who are also athletes in the athlete tally
+            'total_athletes': athletes['total'] + coaches['athletes'],
+            'overall_total': coaches['total'] + athletes['total'],
+            'total_countries': athletes['countries'],
+        }
+        cache.set(key, counts, DASHBOARD_TIMEOUT)
+    return counts
+
+
+def coach_dashboard_counts(coach):
+    key = _dashboard_key(f'coach:{coach.pk}')
+    counts = cache.get(key)
+    if counts is None:
+        athletes = Athlete.objects.filter(coach=coach).aggregate(
+            total=Count('id'),
+            males=Count('id', filter=Q(gender='Male')),
+            females=Count('id', filter=Q(gender='Female')),
+        )
+        counts = {
+            'total_athletes': athletes['total'],
+            'total_females': athletes['females'],
+            'total_males': athletes['males'],
+            'overall_total': athletes['males'] + athletes['females'],
+        }
+        cache.set(key, counts, DASHBOARD_TIMEOUT)
+    return counts
@@ -0,0 +1,125 @@
+import io
+import logging
+import os
+import time
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from . import invitations
+from .models import make_photo_derivatives, photo_derivative_name, process_image
+
+logger = logging.getLogger(__name__)
+
+# Normalized photos, keyed by the SHA-256 of the original upload, so the same
+# picture uploaded again (or for another profile) is only resized once.
+PHOTO_CACHE_DIR = 'photo_cache'
+
+
+def queue_passport_photo(instance, name, upload_hash):
+    args = (instance._meta.app_label, instance._meta.model_name, instance.pk, name, upload_hash)
+    try:
+        process_passport_photo.delay(*args)
+    except Exception as e:
+        # Not processed in the request: build_photo_thumbnails picks up photos left without thumbnails
+        logger.warning("Could not queue photo processing for %s, leaving it for build_photo_thumbnails: %s", name, e)
+
+
+@shared_task
+def process_passport_photo(app_label, model_name, pk, name, upload_hash):
+    model = apps.get_model(app_label, model_name)
+    instance = model.objects.filter(pk=pk).only('passport_photo').first()
+    if instance is None or instance.passport_photo.name != name:
+        # Deleted, or a newer upload has its own job queued
+        return
+
+    ext = os.path.splitext(name)[1].lower()
+    cache_name = f'{PHOTO_CACHE_DIR}/{upload_hash}{ext}'
+    if default_storage.exists(cache_name):
+        with default_storage.open(cache_name, 'rb') as cached:
+            normalized = cached.read()
+        os.utime(default_storage.path(cache_name))  # Mark as recently used for prune_photo_cache
+    else:
+        with instance.passport_photo.open('rb') as photo:
+            image = process_image(photo)
+        output = io.BytesIO()
+        image.save(output, format=Image.registered_extensions().get(ext, 'JPEG'))
+        normalized = output.getvalue()
+        if not default_storage.exists(cache_name):
+            default_storage.save(cache_name, ContentFile(normalized))
+
+    # Replace the stored upload in place, without going through save() again
+    path = instance.passport_photo.path
+    _replace_file(path, normalized)
+    write_photo_derivatives(path, Image.open(io.BytesIO(normalized)))
+
+
+def prune_photo_cache(max_age_days, dry_run=False):
+    """Delete normalized photos not used for `max_age_days`. Returns the removed paths."""
+    directory = default_storage.path(PHOTO_CACHE_DIR)
+    if not os.path.isdir(directory):
+        return []
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            if not dry_run:
+                os.remove(entry.path)
+            removed.append(entry.path)
+    return removed
+
+
+def _replace_file(path, data):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(data)
+    os.replace(temp_path, path)
+
+
+def write_photo_derivatives(path, image):
+    """Write the list-page thumbnails next to the photo stored at `path`."""
+    for width, ext, data in make_photo_derivatives(image):
+        _replace_file(photo_derivative_name(path, width, ext), data)
+
+
+def queue_coach_invitations(tournament_id):
+    try:
+        invite_coaches.delay(tournament_id)
+    except Exception as e:
+        logger.warning("Could not queue invitations for tournament %s, sending inline: %s", tournament_id, e)
+        invite_coaches(tournament_id)
+
+
+@shared_task
+def invite_coaches(tournament_id):
+    """Email every coach not yet invited to `tournament_id` their registration link, a batch per task."""
+    coach_ids = invitations.prepare_invitations(tournament_id)
+    for batch in invitations.batches(coach_ids):
+        try:
+            send_invitation_batch.delay(tournament_id, batch)
+        except Exception as e:
+            logger.warning("Could not queue an invitation batch, sending inline: %s", e)
+            try:
+                send_invitation_batch(tournament_id, batch)
+            except Exception:
+                # Left pending with the error recorded, for the next run
+                logger.exception("Could not send invitations for tournament %s", tournament_id)
+    return len(coach_ids)
+
+
+# The rate limit applies per worker; with BATCH_SIZE messages per task it
+# caps how fast each worker feeds the mail server.
+@shared_task(bind=True, rate_limit=settings.INVITATION_RATE_LIMIT, max_retries=5)
+def send_invitation_batch(self, tournament_id, coach_ids):
+    try:
+        sent, failed = invitations.send_invitations(tournament_id, coach_ids)
+    except invitations.DeliveryInterrupted as e:
+        if self.request.retries >= self.max_retries:
+            invitations.give_up(tournament_id, e.remaining)
+            raise
+        # Back off 1, 2, 4... minutes, retrying only the coaches not yet tried
+        raise self.retry(args=(tournament_id, e.remaining), exc=e, countdown=60 * 2 ** self.request.retries)
+    logger.info("Invitations for tournament %s: %s sent, %s failed", tournament_id, sent, failed)
+    return sent, failed
@@ -0,0 +1,44 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+from ..models import PHOTO_DERIVATIVE_WIDTHS, photo_derivative_name
+
+register = template.Library()
+
+# Passport photos are normalized to 413x531, so thumbnails keep that ratio.
+PHOTO_ASPECT = 531 / 413
+
+
+def _srcset(name, ext):
+    return ', '.join(
+        f"{default_storage.url(photo_derivative_name(name, width, ext))} {width}w"
+        for width in PHOTO_DERIVATIVE_WIDTHS
+    )
+
+
+@register.simple_tag
+def passport_thumbnail(photo, size=64, alt=''):
+    """Render a <picture> for a passport photo at `size` CSS pixels wide.
+
+    `photo` is a FieldFile or a stored file name. The browser picks between the
+    WebP and JPEG thumbnails written by process_passport_photo; photos whose
+    thumbnails have not been generated yet fall back to the original file.
+    """
+    name = getattr(photo, 'name', photo)
+    if not name:
+        return ''
+    height = round(size * PHOTO_ASPECT)
+    if not default_storage.exists(photo_derivative_name(name, PHOTO_DERIVATIVE_WIDTHS[0], 'jpg')):
+        return format_html(
+            '<img src="{}" alt="{}" width="{}" height="{}" loading="lazy">',
+            default_storage.url(name), alt, size, height,
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}px">'
+        '<img src="{}" srcset="{}" sizes="{}px" alt="{}" width="{}" height="{}" loading="lazy">'
+        '</picture>',
+        _srcset(name, 'webp'), size,
+        default_storage.url(photo_derivative_name(name, PHOTO_DERIVATIVE_WIDTHS[0], 'jpg')),
+        _srcset(name, 'jpg'), size, alt, size, height,
+    )
@@ -1,3 +1,264 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+from unittest import mock
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+from openpyxl import load_workbook
+from .instrumentation import RequestMetricsMiddleware
+from .invitations import registration_token
+from .models import Athlete, Belt, Category, Coach, Country, Tournament, TournamentParticipation
+from .views import ATHLETE_TABLE_MAX_PAGE_SIZE, coach_dashboard
 
-# Create your tests here.
+# Size of the synthetic federation the suite runs against
+COUNTRIES = 50
+COACHES = 500
+ATHLETES = 5000
+TOURNAMENTS = 3
+ENTRIES = 1500  # athletes registered in each tournament
+
+RUNS = 5  # timed requests per view; the median is reported
+RESULTS_FILE = os.environ.get('PERF_RESULTS_FILE')  # only written when set
+
+# Upper bounds on the queries a request may issue. None of them may grow
+# with the number of athletes, coaches or entries: a view that crosses its
+# bound has picked up a query per row.
+MAX_QUERIES = {
+    'athlete_list': 6,
+    'athlete_list_data': 8,
+    'index_admin': 6,
+    'index_coach': 6,
+    'coach_dashboard': 3,
+    'tournament_details': 7,
+    'register_athletes_form': 5,
+    'register_athletes_post': 10,
+    'register_athletes_search': 4,
+    'register_athletes_search_page': 4,
+    'coach_registration_form': 4,
+    'coach_registration_post': 8,
+    'generate_pdf': 6,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class ViewPerformanceTests(TestCase):
+    """Query-count bounds and wall times of the main views on a synthetic federation.
+
+    Run with ``USE_SQLITE=true python manage.py test main1``. With
+    ``PERF_RESULTS_FILE`` set, the measurements are written to that file
+    together with the commit, so the files of two commits can be diffed.
+    Timings come from RequestMetricsMiddleware, the same numbers it logs in
+    production.
+    """
+
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        today = datetime.date.today()
+        countries = Country.objects.bulk_create([Country(name=f'Country {n}') for n in range(COUNTRIES)])
+        belts = Belt.objects.bulk_create([Belt(name=f'Belt {n}') for n in range(10)])
+        categories = Category.objects.bulk_create([Category(name=name) for name, _ in Category.CATEGORY_CHOICES])
+
+        User.objects.bulk_create([User(username=f'coach{n}') for n in range(COACHES)])
+        User.objects.bulk_create([User(username=f'athlete{n}') for n in range(ATHLETES)])
+        users = dict(User.objects.values_list('username', 'pk'))
+
+        def profile(model, username, n):
+            return model(
+                user_id=users[username], name=f'{model.__name__} {n}', country=rng.choice(countries),
+                gender=rng.choice(['Male', 'Female']), belt=rng.choice(belts),
+                dob=today - datetime.timedelta(days=rng.randint(6 * 365, 40 * 365)),
+                weight=rng.randint(25, 110),
+            )
+
+        coaches = Coach.objects.bulk_create([profile(Coach, f'coach{n}', n) for n in range(COACHES)])
+        athletes = []
+        for n in range(ATHLETES):
+            athlete = profile(Athlete, f'athlete{n}', n)
+            athlete.coach = rng.choice(coaches)
+            athlete.is_active = rng.random() < 0.9
+            athletes.append(athlete)
+        athletes = Athlete.objects.bulk_create(athletes)
+        Athlete.category.through.objects.bulk_create([
+            Athlete.category.through(athlete_id=athlete.pk, category_id=category.pk)
+            for athlete in athletes
+            for category in rng.sample(categories, 2)
+        ])
+
+        tournaments = Tournament.objects.bulk_create([
+            Tournament(
+                name=f'Open {n}', edition=n + 1, location='Nairobi',
+                start_date=today + datetime.timedelta(days=30 * n),
+                end_date=today + datetime.timedelta(days=30 * n + 2),
+            )
+            for n in range(TOURNAMENTS)
+        ])
+        TournamentParticipation.objects.bulk_create([
+            TournamentParticipation(tournament=tournament, athlete=athlete, coach=athlete.coach)
+            for tournament in tournaments
+            for athlete in rng.sample(athletes, ENTRIES)
+        ])
+
+        cls.tournament = tournaments[0]
+        cls.coach = coaches[0]
+        cls.athletes = athletes
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.results or not RESULTS_FILE:
+            return
+        report = {
+            'commit': git_commit(),
+            'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'dataset': {
+                'countries': COUNTRIES, 'coaches': COACHES, 'athletes': ATHLETES,
+                'tournaments': TOURNAMENTS, 'entries_per_tournament': ENTRIES,
+            },
+            'views': dict(sorted(cls.results.items())),
+        }
+        with open(RESULTS_FILE, 'w') as results:
+            json.dump(report, results, indent=2)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def measure(self, name, request):
+        """Call `request()` RUNS times, record the metrics and check the query bound."""
+        samples = []
+        for _ in range(RUNS):
+            with self.assertLogs('main1.instrumentation', 'INFO') as logs:
+                response = request()
+            response.close()
+            self.assertLess(response.status_code, 400, f'{name} returned {response.status_code}')
+            samples.append(logs.records[-1].metrics)
+        queries = max(sample['queries'] for sample in samples)
+        self.results[name] = {
+            'queries': queries,
+            'max_queries': MAX_QUERIES[name],
+            'total_ms': statistics.median(sample['total_ms'] for sample in samples),
+            'db_ms': statistics.median(sample['db_ms'] for sample in samples),
+            'render_ms': statistics.median(sample['render_ms'] for sample in samples),
+            'runs': RUNS,
+        }
+        duplicates = max(samples, key=lambda sample: sample['queries'])['duplicate_queries']
+        self.assertLessEqual(
+            queries, MAX_QUERIES[name],
+            f'{name} issued {queries} queries; most repeated: {json.dumps(duplicates, indent=2)}',
+        )
+
+    def test_athlete_list(self):
+        self.measure('athlete_list', lambda: self.client.get(reverse('athlete_list')))
+        self.measure('athlete_list_data', lambda: self.client.get(
+            reverse('athlete_list_data'), {'draw': 1, 'start': 0, 'length': 100, 'order[0][column]': 1},
+        ))
+
+    def test_athlete_list_export(self):
+        # Every filtered row, not just the page the table shows
+        params = {'gender': 'Female', 'min_age': 18, 'order[0][column]': 1}
+        filtered = self.client.get(reverse('athlete_list_data'), {**params, 'length': 10}).json()['recordsFiltered']
+        self.assertGreater(filtered, ATHLETE_TABLE_MAX_PAGE_SIZE)
+        response = self.client.get(reverse('athlete_list_export'), {**params, 'format': 'csv', 'visible': [1, 2, 12]})
+        lines = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(lines[0], ['Name', 'Country', 'Event'])
+        self.assertEqual(len(lines) - 1, filtered)
+        self.assertEqual(lines[1:], sorted(lines[1:], key=lambda line: line[0]))
+        response = self.client.get(reverse('athlete_list_export'), {**params, 'format': 'xlsx'})
+        sheet = load_workbook(io.BytesIO(response.content), read_only=True).active
+        self.assertEqual(sum(1 for _ in sheet.iter_rows()) - 1, filtered)
+
+    def test_index(self):
+        self.measure('index_admin', lambda: self.client.get(reverse('index')))
+        self.client.force_login(self.coach.user)
+        self.measure('index_coach', lambda: self.client.get(reverse('index')))
+
+    def test_coach_dashboard(self):
+        # Not reachable by URL ('' belongs to the index view), so called directly
+        view = RequestMetricsMiddleware(coach_dashboard)
+
+        def request():
+            request = RequestFactory().get('/')
+            request.user = self.coach.user
+            return view(request)
+
+        self.measure('coach_dashboard', request)
+
+    def test_tournament_details(self):
+        self.measure('tournament_details', lambda: self.client.get(
+            reverse('tournament_details', args=[self.tournament.pk]),
+        ))
+
+    def test_register_athletes(self):
+        url = reverse('register_athletes', args=[self.tournament.pk])
+        self.measure('register_athletes_form', lambda: self.client.get(url))
+        registered = set(
+            TournamentParticipation.objects.filter(tournament=self.tournament).values_list('athlete_id', flat=True)
+        )
+        candidates = [athlete.pk for athlete in self.athletes if athlete.is_active and athlete.pk not in registered]
+        batches = iter(candidates[i::RUNS] for i in range(RUNS))
+        self.measure('register_athletes_post', lambda: self.client.post(url, {'athletes': next(batches)[:50]}))
+
+    def test_register_athletes_search(self):
+        url = reverse('register_athletes_search', args=[self.tournament.pk])
+        self.measure('register_athletes_search', lambda: self.client.get(url, {'q': 'Athlete 12', 'length': 25}))
+        self.measure('register_athletes_search_page', lambda: self.client.get(url, {'start': 2000, 'length': 1000}))
+        self.assertEqual(len(self.client.get(url, {'length': 1000}).json()['results']), 100)
+        # A coach only finds their own athletes
+        self.client.force_login(self.coach.user)
+        results = self.client.get(url, {'length': 100}).json()['results']
+        self.assertTrue(results)
+        self.assertEqual({result['coach'] for result in results}, {self.coach.name})
+
+    def test_register_athletes_needs_staff_or_coach(self):
+        # An athlete's login must not see (or enter) the whole registry
+        self.client.force_login(self.athletes[0].user)
+        for name in ('register_athletes', 'register_athletes_search'):
+            self.assertEqual(self.client.get(reverse(name, args=[self.tournament.pk])).status_code, 403)
+        response = self.client.post(
+            reverse('register_athletes', args=[self.tournament.pk]), {'athletes': [self.athletes[1].pk]},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_coach_registration(self):
+        # Reached from the emailed link, without logging in
+        self.client.logout()
+        url = reverse('coach_registration', args=[registration_token(self.tournament.pk, self.coach.pk)])
+        self.measure('coach_registration_form', lambda: self.client.get(url))
+        unregistered = iter(self.client.get(url).context['form'].fields['athletes'].queryset)
+        self.measure('coach_registration_post', lambda: self.client.post(url, {'athletes': [next(unregistered).pk]}))
+
+    def test_generate_pdf(self):
+        # A different athlete each run, so every run fills a new form
+        athletes = iter(self.athletes)
+        with tempfile.TemporaryDirectory() as form_cache, \
+                mock.patch('main1.form_cache.FORM_CACHE_DIR', form_cache):
+            self.measure('generate_pdf', lambda: self.client.get(
+                reverse('generate_pdf_individual', args=[self.tournament.pk, next(athletes).pk]),
+            ))
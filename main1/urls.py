@@ -16,8 +16,11 @@ urlpatterns = [
     
 
     path('athletes/', AthleteListView.as_view(), name='athlete_list'),
+    path('athletes/data/', views.athlete_list_data, name='athlete_list_data'),
+    path('athletes/export/', views.athlete_list_export, name='athlete_list_export'),
     path('athlete/<int:pk>/', AthleteDetailView.as_view(), name='athlete_detail'),
     path('athlete/create/', AthleteCreateView.as_view(), name='athlete_create'),
+    path('athletes/import/', views.athlete_import, name='athlete_import'),
     path('athlete/update/<int:pk>/', AthleteUpdateView.as_view(), name='athlete_update'),
     path('athlete/delete/<int:pk>/', AthleteDeleteView.as_view(), name='athlete_delete'),
 
@@ -56,6 +59,18 @@ urlpatterns = [
     path('tournaments/', views.TournamentListView, name='tournament_list'),
     path('tournament/<int:tournament_id>/', TournamentDetailsView.as_view(), name='tournament_details'),
     path('tournament/<int:tournament_id>/register_athletes/', views.register_athletes, name='register_athletes'),
+    path('tournament/<int:tournament_id>/register_athletes/search/', views.register_athletes_search, name='register_athletes_search'),
+    path('registration/<str:token>/', views.coach_registration, name='coach_registration'),
+    path('tournament/<int:tournament_id>/scoreboard/', views.tournament_scoreboard, name='tournament_scoreboard'),
+    path('tournament/<int:tournament_id>/live/', views.tournament_live_feed, name='tournament_live_feed'),
+    path('tournament/<int:tournament_id>/ranking/', views.tournament_ranking, name='tournament_ranking'),
+    path('tournament/<int:tournament_id>/ranking/pdf/', views.tournament_rank_form, name='tournament_rank_form'),
+    path('bouts/<int:pk>/result/', views.bout_result, name='bout_result'),
+    path('checkin/', views.checkin_start, name='checkin_start'),
+    path('tournament/<int:tournament_id>/checkin/', views.checkin_scanner, name='checkin_scanner'),
+    path('tournament/<int:tournament_id>/checkin/scan/', views.checkin_scan, name='checkin_scan'),
+    path('tournament/<int:tournament_id>/checkin/headcount/', views.checkin_headcount, name='checkin_headcount'),
+    path('tournament/<int:tournament_id>/invitations/', views.tournament_invitations, name='tournament_invitations'),
     path('generate-pdf/<int:tournament_id>/', views.generate_pdf, name='generate_pdf'),
     path('generate-pdf/<int:tournament_id>/<int:athlete_id>/', views.generate_pdf, name='generate_pdf_individual'), 
     path('tournaments/create/', TournamentCreateView.as_view(), name='tournament_create'),
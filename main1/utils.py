@@ -3,8 +3,10 @@ from main1.models import Coach
 # tasks.py
 # tasks.py
 from celery import shared_task
-from pdfrw import PdfReader, PdfWriter
+from .pdf_forms import get_template
 import os
+import zipfile
+from asgiref.sync import sync_to_async
 from django.conf import settings
 import logging
 
@@ -13,29 +15,14 @@ logger = logging.getLogger(__name__)
 @shared_task
 def fill_pdf_form_task(template_path, output_path, athlete_data):
     try:
-        template_pdf = PdfReader(template_path)
-        writer = PdfWriter()
-        
-        for page in template_pdf.pages:
-            annotations = page.get('/Annots')
-            if annotations:
-                for annot in annotations:
-                    field = annot.getObject()
-                    field_name = field.get('/T')
-                    if field_name:
-                        field_name = field_name[1:-1]  # Remove parentheses
-                        field_value = athlete_data.get(field_name, '')
-                        field.update({
-                            '/V': field_value
-                        })
-
-            writer.addpage(page)
-        
+        # The template is parsed once per worker and re-used for every task
+        pdf = get_template(template_path).fill(athlete_data)
+
         with open(output_path, 'wb') as output_file:
-            writer.write(output_file)
-        
+            output_file.write(pdf)
+
         return "PDF form filling successful"
-    
+
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -86,3 +73,49 @@ def get_coach_for_user(user_id):
     except (User.DoesNotExist, Coach.DoesNotExist):
         return None
 
+
+class _ZipBuffer:
+    # Write-only file object that hands written bytes back to the caller.
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_stream(files):
+    """Yield a ZIP archive of (name, bytes) pairs chunk by chunk, for StreamingHttpResponse."""
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+async def iterate_in_thread(iterator):
+    """Async iterator over a sync one, advancing it an item at a time.
+
+    Django's ASGI handler reads a sync StreamingHttpResponse iterator into
+    a list before sending anything; wrapped in this, it is streamed. Items
+    are produced on the request's own sync thread, so querysets iterated
+    by `iterator` keep using the request's database connection.
+    """
+    iterator = iter(iterator)
+    done = object()
+    advance = sync_to_async(next)
+    try:
+        while (item := await advance(iterator, done)) is not done:
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close)()
@@ -1,24 +1,44 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import LoginView, LogoutView, redirect_to_login
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
-from django.views.generic import CreateView, UpdateView, DeleteView, DetailView, ListView
+from django.views.generic import CreateView, UpdateView, DeleteView, DetailView, ListView, TemplateView
 from .forms import *
-from .models import Athlete, Coach, Staff, Media, RoleType, Category, Country, Belt, Team, Membership, Tournament, TournamentParticipation
+from .models import Accommodation, Athlete, Bout, Coach, CoachInvitation, Staff, Media, RoleType, Category, Country, Belt, Team, Membership, Tournament, TournamentParticipation
 from django.urls import reverse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from main1.utils import *
 from django.conf import settings
 from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
 import os
 from django.contrib import messages
 import logging
-from django.http import HttpResponse
-from fillpdf import fillpdfs
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.utils.cache import get_conditional_response
+from django.utils.text import slugify
+from django.db.models import CharField, Count, F, Q, Value
+from .pdf_forms import RANK_FORM, fill_many, fill_rank_form, get_template
+from .form_cache import cached_form_path, form_cache_key
+import csv
 import datetime
+import tempfile
+import zipfile
 from .utils import *
+from .caching import PEOPLE_LISTS, TOURNAMENT_LIST, belts, cache_generation, countries
+from .divisions import birth_date_cutoff, get_division_table
+from .importers import AthleteImporter, extract_photos, read_roster
+from .templatetags.photo_tags import passport_thumbnail
+from .live import blocking_event_stream, event_stream
+from .results import bout_payload, medal_table, participant_name, record_bout_result
+from .checkin import headcount, scan
+from .tasks import queue_coach_invitations
+from .invitations import read_registration_token
+from django.core.signing import BadSignature, SignatureExpired
 logger = logging.getLogger(__name__)
 
 @login_required
@@ -47,103 +67,397 @@ def coach_dashboard(request):
         # Handle the case where no coach is found for the logged-in user
         return render(request, 'no_coach.html', {'message': 'You are not assigned as a coach.'})
 
+REGISTRATION_SEARCH_PAGE_SIZE = 25
+REGISTRATION_SEARCH_MAX_PAGE_SIZE = 100
+
+
+def _registering_coach(user):
+    # Coaches register their own and their club's athletes, staff anyone
+    # (None); nobody else may register athletes
+    if user.is_staff:
+        return None
+    coach = Coach.objects.filter(user=user).only('pk', 'region_id').first()
+    if coach is None:
+        raise PermissionDenied
+    return coach
+
+
 @login_required
 def register_athletes(request, tournament_id):
     # Get the tournament object using the provided tournament_id
     tournament = get_object_or_404(Tournament, id=tournament_id)
+    coach = _registering_coach(request.user)
 
     # If the form is submitted (POST request)
     if request.method == 'POST':
         # Create a form instance using the POST data and pass the tournament
-        form = AthleteSelectionForm(request.POST, tournament=tournament)
+        form = AthleteSelectionForm(request.POST, tournament=tournament, coach=coach)
         if form.is_valid():
             # Get the selected athletes from the form
             selected_athletes = form.cleaned_data['athletes']
             
-            # Iterate through the selected athletes and register them for the tournament
-            for athlete in selected_athletes:
-                # Ensure the athlete is not already participating in the tournament
-                if not TournamentParticipation.objects.filter(
-                    tournament=tournament,
-                    athlete=athlete
-                ).exists():
-                    # Create a new participation record
-                    TournamentParticipation.objects.create(
-                        tournament=tournament,
-                        athlete=athlete
-                    )
+            inserted, existing = TournamentParticipation.objects.register(tournament, selected_athletes, coach=coach)
+            messages.success(request, f"Registered {inserted} athlete(s); {existing} already registered.")
 
             # Redirect to the tournament detail page after successful registration
             return redirect('tournament_details', tournament_id=tournament.id)
     else:
-        # If it's a GET request, show an empty form
-        form = AthleteSelectionForm(tournament=tournament)
+        # If it's a GET request, show an empty form; athletes are found with register_athletes_search
+        form = AthleteSelectionForm(tournament=tournament, coach=coach)
 
     # Render the form in the template with the tournament context
     return render(request, 'client/register_athletes.html', {
         'form': form,
         'tournament': tournament,
+        'page_size': REGISTRATION_SEARCH_PAGE_SIZE,
+    })
+
+
+@login_required
+def register_athletes_search(request, tournament_id):
+    """A page of the athletes the user can still enter, whose name contains GET['q'].
+
+    Pages hold GET['length'] athletes (at most REGISTRATION_SEARCH_MAX_PAGE_SIZE)
+    from GET['start'], in name order; `more` says whether another page follows.
+    """
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    athletes = registration_candidates(tournament, _registering_coach(request.user))
+    search = request.GET.get('q', '').strip()
+    if search:
+        athletes = athletes.filter(name__icontains=search)
+
+    start = request.GET.get('start', '')
+    start = int(start) if start.isdigit() else 0
+    length = request.GET.get('length', '')
+    length = min(int(length), REGISTRATION_SEARCH_MAX_PAGE_SIZE) if length.isdigit() and int(length) else REGISTRATION_SEARCH_PAGE_SIZE
+    # One row past the page tells whether there is another, without a COUNT
+    rows = list(
+        athletes.order_by('name', 'pk').values('pk', 'name', 'country__name', 'coach__name')[start:start + length + 1]
+    )
+    return JsonResponse({
+        'results': [
+            {'id': row['pk'], 'name': row['name'], 'country': row['country__name'], 'coach': row['coach__name'] or ''}
+            for row in rows[:length]
+        ],
+        'more': len(rows) > length,
     })
 
+
+def coach_registration(request, token):
+    """Register a coach's athletes from the link emailed to them; the signed token stands in for a login.
+
+    Only the coach, the tournament and the coach's own athletes are read,
+    each by an indexed lookup.
+    """
+    try:
+        tournament_id, coach_id = read_registration_token(token)
+    except SignatureExpired:
+        return render(request, 'tournament/coach_registration.html', {
+            'error': "This registration link has expired. Ask the organisers to send you a new one.",
+        }, status=403)
+    except BadSignature:
+        coach = tournament = None
+    else:
+        coach = Coach.objects.filter(pk=coach_id).only('name').first()
+        tournament = Tournament.objects.filter(pk=tournament_id).first()
+    if coach is None or tournament is None:
+        return render(request, 'tournament/coach_registration.html', {
+            'error': "This registration link is not valid.",
+        }, status=404)
+
+    if request.method == 'POST':
+        form = CoachRegistrationForm(request.POST, tournament=tournament, coach=coach)
+        if form.is_valid():
+            inserted, existing = TournamentParticipation.objects.register(
+                tournament, form.cleaned_data['athletes'], coach=coach,
+            )
+            messages.success(request, f"Registered {inserted} athlete(s); {existing} already registered.")
+            return redirect('coach_registration', token=token)
+    else:
+        form = CoachRegistrationForm(tournament=tournament, coach=coach)
+    return render(request, 'tournament/coach_registration.html', {
+        'form': form,
+        'tournament': tournament,
+        'coach': coach,
+        'registered': TournamentParticipation.objects.filter(tournament=tournament, athlete__coach=coach)
+            .values_list('athlete__name', flat=True).order_by('athlete__name'),
+    })
+
+@login_required
+def athlete_import(request):
+    report = None
+    if request.method == 'POST':
+        form = AthleteImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            country = form.cleaned_data['country']
+            with tempfile.TemporaryDirectory() as photo_dir:
+                photos = form.cleaned_data['photos']
+                try:
+                    if photos:
+                        extract_photos(photos, photo_dir)
+                except (OSError, zipfile.BadZipFile) as e:
+                    form.add_error('photos', f'Could not read the photos: {e}')
+                else:
+                    importer = AthleteImporter(
+                        default_country=country.name if country else None,
+                        photo_dir=photo_dir if photos else None,
+                    )
+                    roster = form.cleaned_data['roster']
+                    try:
+                        # Rows are all read and checked before anything is saved
+                        report = importer.run(read_roster(roster, roster.name), dry_run=form.cleaned_data['dry_run'])
+                    except (OSError, ValueError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+                        form.add_error('roster', f'Could not read the roster: {e}')
+            if report is not None and not form.cleaned_data['dry_run']:
+                messages.success(
+                    request, f"Created {report.created} and updated {report.updated} athlete(s).",
+                )
+    else:
+        form = AthleteImportForm()
+    return render(request, 'athletes/athlete_import.html', {'form': form, 'report': report})
+
 # Athlete Views
+# Columns of the athletes table, in display order. None marks columns that
+# cannot be sorted server-side (row number, events).
+ATHLETE_TABLE_COLUMNS = [
+    None, 'name', 'country', 'coach', 'club', 'id_passport_number', 'passport', 'age',
+    'weight', 'division', 'gender', 'belt', None, 'contacts', 'arrival_date',
+    'departure_date', 'accommodation', None,
+]
+ATHLETE_TABLE_SEARCH_FIELDS = [
+    'name', 'country__name', 'region__name', 'id_passport_number', 'passport', 'belt__name', 'gender', 'contacts',
+]
+ATHLETE_TABLE_MAX_PAGE_SIZE = 100
+
+
+def _athlete_table_rows(queryset, kind, coach_name):
+    # Every column is an annotation so both halves of the UNION select the
+    # same columns in the same order.
+    return queryset.annotate(
+        kind=Value(kind, output_field=CharField()),
+        country_name=F('country__name'),
+        coach_name=coach_name,
+        club=F('region__name'),
+        age=F('current_age'),
+        belt_name=F('belt__name'),
+        accommodation_name=F('accommodation__name'),
+    ).values(
+        'kind', 'pk', 'name', 'country_name', 'coach_name', 'club', 'id_passport_number', 'passport', 'age',
+        'weight', 'division', 'gender', 'belt_name', 'contacts', 'arrival_date', 'departure_date',
+        'accommodation_name', 'passport_photo',
+    )
+
+
+def _filter_athlete_table(queryset, params, today):
+    search = params.get('search[value]', '').strip()
+    if search:
+        query = Q(division__icontains=search)
+        for field in ATHLETE_TABLE_SEARCH_FIELDS:
+            query |= Q(**{f'{field}__icontains': search})
+        queryset = queryset.filter(query)
+
+    filters = {
+        'country__name': params.get('country'),
+        'gender': params.get('gender'),
+        'division': params.get('division'),
+        'belt__name': params.get('belt'),
+    }
+    queryset = queryset.filter(**{field: value for field, value in filters.items() if value})
+
+    # Age limits become date of birth limits so they can use an index on dob.
+    min_age, max_age = params.get('min_age', ''), params.get('max_age', '')
+    if min_age.isdigit():
+        queryset = queryset.filter(dob__lte=birth_date_cutoff(today, int(min_age)))
+    if max_age.isdigit():
+        queryset = queryset.filter(dob__gt=birth_date_cutoff(today, int(max_age) + 1))
+    return queryset
+
+
+def _athlete_table_categories(rows):
+    # Events for the current page only, one query per model.
+    ids = {'athlete': [], 'coach': []}
+    for row in rows:
+        ids[row['kind']].append(row['pk'])
+    categories = {}
+    through_models = {'athlete': Athlete.category.through, 'coach': Coach.category.through}
+    for kind, pks in ids.items():
+        if not pks:
+            continue
+        owner = f'{kind}_id'
+        for owner_id, name in through_models[kind].objects.filter(**{f'{owner}__in': pks}).values_list(owner, 'category__name'):
+            categories.setdefault((kind, owner_id), []).append(name)
+    return categories
+
+
+def _athlete_table_query(params, today):
+    """The UNION of athlete and coach-athlete rows matching the table's search, filters and ordering."""
+    athletes = _filter_athlete_table(Athlete.objects.with_division(today=today), params, today)
+    coach_athletes = _filter_athlete_table(Coach.objects.filter(is_athlete=True).with_division(today=today), params, today)
+    rows = _athlete_table_rows(athletes, 'athlete', F('coach__name')).union(
+        _athlete_table_rows(coach_athletes, 'coach', Value('', output_field=CharField())),
+        all=True,
+    )
+
+    ordering = []
+    index = 0
+    while f'order[{index}][column]' in params:
+        column = params.get(f'order[{index}][column]', '')
+        if column.isdigit() and int(column) < len(ATHLETE_TABLE_COLUMNS):
+            field = ATHLETE_TABLE_COLUMNS[int(column)]
+            if field:
+                field = {'country': 'country_name', 'coach': 'coach_name', 'belt': 'belt_name',
+                         'accommodation': 'accommodation_name'}.get(field, field)
+                ordering.append(f'-{field}' if params.get(f'order[{index}][dir]') == 'desc' else field)
+        index += 1
+    return rows.order_by(*(ordering or ['name']), 'kind', 'pk')
+
+
+def _athlete_table_record(row, categories):
+    # The text columns of a row, keyed by their DataTables `data` name
+    return {
+        'name': row['name'],
+        'country': row['country_name'],
+        'coach': row['coach_name'] or '',
+        'club': row['club'] or 'N/A',
+        'id_passport_number': row['id_passport_number'],
+        'passport': row['passport'],
+        'age': row['age'],
+        'weight': row['weight'],
+        'division': row['division'],
+        'gender': row['gender'],
+        'belt': row['belt_name'] or 'N/A',
+        'category': ', '.join(categories.get((row['kind'], row['pk']), [])),
+        'contacts': row['contacts'],
+        'arrival_date': row['arrival_date'],
+        'departure_date': row['departure_date'],
+        'accommodation': row['accommodation_name'] or 'N/A',
+    }
+
+
+@login_required
+def athlete_list_data(request):
+    """Server-side processing endpoint for the DataTables athletes table."""
+    params = request.GET
+    today = datetime.date.today()
+
+    records_total = Athlete.objects.count() + Coach.objects.filter(is_athlete=True).count()
+    rows = _athlete_table_query(params, today)
+    records_filtered = rows.count()
+
+    start = int(params['start']) if params.get('start', '').isdigit() else 0
+    length = params.get('length', '')
+    length = min(int(length), ATHLETE_TABLE_MAX_PAGE_SIZE) if length.isdigit() else ATHLETE_TABLE_MAX_PAGE_SIZE
+    page = list(rows[start:start + length])
+    categories = _athlete_table_categories(page)
+
+    data = []
+    for number, row in enumerate(page, start=start + 1):
+        detail = 'athlete_detail' if row['kind'] == 'athlete' else 'coach_detail'
+        data.append({
+            'DT_RowAttr': {'data-href': reverse(detail, args=[row['pk']])},
+            'number': number,
+            **_athlete_table_record(row, categories),
+            'photo': passport_thumbnail(row['passport_photo'], 48, row['name']),
+        })
+
+    draw = params.get('draw', '')
+    return JsonResponse({
+        'draw': int(draw) if draw.isdigit() else 0,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': data,
+    })
+
+
+# Columns the export can contain, by their index in the table: everything
+# but the row number and the photo.
+ATHLETE_TABLE_EXPORT_COLUMNS = {
+    1: ('name', 'Name'), 2: ('country', 'Country'), 3: ('coach', 'Coach'), 4: ('club', 'Club'),
+    5: ('id_passport_number', 'ID Number'), 6: ('passport', 'Passport'), 7: ('age', 'Age'),
+    8: ('weight', 'Weight'), 9: ('division', 'Weight Category'), 10: ('gender', 'Gender'),
+    11: ('belt', 'Belt'), 12: ('category', 'Event'), 13: ('contacts', 'Contacts'),
+    14: ('arrival_date', 'Arrival Date'), 15: ('departure_date', 'Departure Date'),
+    16: ('accommodation', 'Accommodation'),
+}
+ATHLETE_TABLE_EXPORT_CHUNK_SIZE = 1000
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+@login_required
+def athlete_list_export(request):
+    """Every row of the athletes table matching its current search, filters
+    and ordering, as CSV or XLSX, limited to the columns in `visible`."""
+    params = request.GET
+    export_format = params.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return HttpResponse("Unknown export format", status=400)
+    columns = [
+        ATHLETE_TABLE_EXPORT_COLUMNS[int(index)]
+        for index in params.getlist('visible') or ATHLETE_TABLE_EXPORT_COLUMNS
+        if str(index).isdigit() and int(index) in ATHLETE_TABLE_EXPORT_COLUMNS
+    ]
+    rows = _athlete_table_query(params, datetime.date.today())
+
+    def records():
+        yield [heading for _, heading in columns]
+        chunk = []
+        for row in rows.iterator(chunk_size=ATHLETE_TABLE_EXPORT_CHUNK_SIZE):
+            chunk.append(row)
+            if len(chunk) == ATHLETE_TABLE_EXPORT_CHUNK_SIZE:
+                yield from chunk_records(chunk)
+                chunk = []
+        yield from chunk_records(chunk)
+
+    def chunk_records(chunk):
+        # Events for a chunk at a time, as the table does for a page
+        categories = _athlete_table_categories(chunk)
+        for row in chunk:
+            record = _athlete_table_record(row, categories)
+            yield [record[key] for key, _ in columns]
+
+    filename = f'athletes {datetime.date.today():%Y-%m-%d}.{export_format}'
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        lines = (writer.writerow(record) for record in records())
+        if isinstance(request, ASGIRequest):
+            lines = iterate_in_thread(lines)
+        response = StreamingHttpResponse(lines, content_type='text/csv')
+    else:
+        from openpyxl import Workbook
+
+        # write_only workbooks stream rows to disk instead of keeping cells in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Athletes')
+        for record in records():
+            sheet.append(record)
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            output.seek(0)
+            response = HttpResponse(
+                output.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @method_decorator(login_required, name='dispatch')
-class AthleteListView(LoginRequiredMixin, ListView):
-    model = Athlete
+class AthleteListView(LoginRequiredMixin, TemplateView):
+    # Rows are loaded page by page from athlete_list_data; only the filter
+    # options are rendered with the page.
     template_name = 'athletes/athlete_list.html'
-    context_object_name = 'athletes'
-
-    def get_queryset(self):
-        athletes = Athlete.objects.select_related('country', 'belt', 'accommodation').prefetch_related('category')
-        coach_athletes = Coach.objects.filter(is_athlete=True).select_related('country', 'belt').prefetch_related('category')
-
-        athletes_list = []
-        for athlete in athletes:
-            athlete_data = {
-                'pk': athlete.pk,
-                'name': athlete.name,
-                'passport_photo': athlete.passport_photo.url if athlete.passport_photo else None,
-                'country': athlete.country.name,
-                'region': athlete.region.name if athlete.region else 'N/A',
-                'id_passport_number': athlete.id_passport_number,
-                'passport': athlete.passport,
-                'dob': athlete.dob,
-                'gender': athlete.gender,
-                'contacts': athlete.contacts,
-                'arrival_date': athlete.arrival_date,
-                'departure_date': athlete.departure_date,
-                'accommodation': athlete.accommodation.name if athlete.accommodation else 'N/A',
-                'weight': athlete.weight,
-                'belt': athlete.belt.name if athlete.belt else 'N/A',
-                'category': list(athlete.category.values_list('name', flat=True)),
-                'age': athlete.age,
-                'get_weight_category': athlete.get_weight_category,
-            }
-            athletes_list.append(athlete_data)
-
-        for coach in coach_athletes:
-            coach_data = {
-                'pk': coach.pk,
-                'name': coach.name,
-                'passport_photo': coach.passport_photo.url if coach.passport_photo else None,
-                'country': coach.country.name,
-                'region': coach.region.name if coach.region else 'N/A',
-                'id_passport_number': coach.id_passport_number,
-                'passport': coach.passport,
-                'dob': coach.dob,
-                'gender': coach.gender,
-                'contacts': coach.contacts,
-                'arrival_date': coach.arrival_date,
-                'departure_date': coach.departure_date,
-                'accommodation': coach.accommodation.name if coach.accommodation else 'N/A',
-                'weight': coach.weight,
-                'belt': coach.belt.name if coach.belt else 'N/A',
-                'category': list(coach.category.values_list('name', flat=True)),
-                'age': coach.age,
-                'get_weight_category': coach.get_weight_category,
-            }
-            athletes_list.append(coach_data)
-
-        return athletes_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['countries'] = [name for _, name in countries()]
+        context['belts'] = [name for _, name in belts()]
+        context['genders'] = [value for value, label in Athlete.GENDER_CHOICES]
+        context['divisions'] = sorted({rule.label for rule in get_division_table().rules()})
+        return context
 
 @method_decorator(login_required, name='dispatch')
 class AthleteDetailView(DetailView):
@@ -291,34 +605,35 @@ class MediaDeleteView(DeleteView):
     success_url = reverse_lazy('media_list')
 
 # Gender-Specific Views
+# The tables are cached as template fragments shared by every user, keyed by
+# the people-lists generation (bumped by signals) and today's date, since ages
+# and weight categories are computed from it. Querysets are lazy, so a cache
+# hit runs no queries for the rows.
+PEOPLE_LIST_RELATED = ['country', 'region', 'belt', 'accommodation']
+
+
+def _people_list_context(coaches, athletes):
+    return {
+        'coaches': coaches.select_related(*PEOPLE_LIST_RELATED),
+        'athletes': athletes.select_related('coach', *PEOPLE_LIST_RELATED),
+        'cache_generation': cache_generation(PEOPLE_LISTS),
+        'today': datetime.date.today(),
+    }
+
+
 @login_required
 def male_coaches_athletes(request):
-    male_coaches = Coach.objects.filter(gender='Male')
-    male_athletes = Athlete.objects.filter(gender='Male')
-    context = {
-        'coaches': male_coaches,
-        'athletes': male_athletes
-    }
+    context = _people_list_context(Coach.objects.filter(gender='Male'), Athlete.objects.filter(gender='Male'))
     return render(request, 'links/male_coaches_athletes.html', context)
 
 @login_required
 def female_coaches_athletes(request):
-    female_coaches = Coach.objects.filter(gender='Female')
-    female_athletes = Athlete.objects.filter(gender='Female')
-    context = {
-        'coaches': female_coaches,
-        'athletes': female_athletes
-    }
+    context = _people_list_context(Coach.objects.filter(gender='Female'), Athlete.objects.filter(gender='Female'))
     return render(request, 'links/female_coaches_athletes.html', context)
 
 @login_required
 def all_coaches_athletes(request):
-    coaches = Coach.objects.all()
-    athletes = Athlete.objects.all()
-    context = {
-        'coaches': coaches,
-        'athletes': athletes
-    }
+    context = _people_list_context(Coach.objects.all(), Athlete.objects.all())
     return render(request, 'links/all_coaches_athletes.html', context)
 
 # Team Views
@@ -385,7 +700,7 @@ def TournamentListView(request):
     if Coach.objects.filter(user=request.user).exists():
         return redirect('coach_dashboard')
     tournaments = Tournament.objects.all()
-    context = {'tournaments': tournaments}
+    context = {'tournaments': tournaments, 'cache_generation': cache_generation(TOURNAMENT_LIST)}
     return render(request, 'tournament/tournament_list.html', context)
 
 
@@ -451,6 +766,166 @@ class TournamentDetailsViewCoach(LoginRequiredMixin, DetailView):
         context['coach_id'] = coach_id  # Add coach_id to the context if needed
 
         return context    
+BOUT_RELATED = ['category', 'red__athlete', 'red__coach', 'blue__athlete', 'blue__coach', 'winner__athlete', 'winner__coach']
+SCOREBOARD_LENGTH = 50
+
+
+@login_required
+def tournament_scoreboard(request, tournament_id):
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    # Walkovers and bouts still waiting for a fighter are not shown
+    bouts = Bout.objects.filter(tournament=tournament, red__isnull=False, blue__isnull=False).select_related(*BOUT_RELATED)
+    upcoming = bouts.filter(winner__isnull=True).order_by(F('scheduled_at').asc(nulls_last=True), 'round', 'position')
+    decided = bouts.filter(winner__isnull=False).order_by(F('scheduled_at').desc(nulls_last=True), '-round')
+    return render(request, 'tournament/tournament_scoreboard.html', {
+        'tournament': tournament,
+        'upcoming': [bout_payload(bout) for bout in upcoming[:SCOREBOARD_LENGTH]],
+        'results': [bout_payload(bout) for bout in decided[:SCOREBOARD_LENGTH]],
+    })
+
+
+async def tournament_live_feed(request, tournament_id):
+    # Under tongmoodoo.asgi, main1.live.LiveFeedApplication answers this URL
+    # before Django sees it; this view serves it under runserver/WSGI, or an
+    # ASGI server pointed straight at Django.
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not await Tournament.objects.filter(pk=tournament_id).aexists():
+        raise Http404('No such tournament.')
+    # WSGI handlers collect an async iterator into a list before sending it,
+    # which for a stream that never ends means sending nothing at all
+    stream = event_stream(tournament_id) if isinstance(request, ASGIRequest) else blocking_event_stream(tournament_id)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+
+@login_required
+@require_POST
+def bout_result(request, pk):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    bout = get_object_or_404(Bout.objects.select_related(*BOUT_RELATED), pk=pk)
+    winner = {'red': bout.red, 'blue': bout.blue}.get(request.POST.get('winner'))
+    try:
+        record_bout_result(bout, winner)
+    except ValueError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f"{participant_name(winner)} wins {bout}.")
+    return redirect('tournament_scoreboard', tournament_id=bout.tournament_id)
+
+
+@login_required
+def tournament_ranking(request, tournament_id):
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    return render(request, 'tournament/tournament_ranking.html', {
+        'tournament': tournament,
+        'medal_table': medal_table(tournament),
+    })
+
+
+
+@login_required
+def checkin_start(request):
+    # The tournament running today, else the next one
+    tournament = Tournament.objects.filter(end_date__gte=datetime.date.today()).order_by('start_date').first()
+    if tournament is None:
+        messages.error(request, "There is no current or upcoming tournament to check in for.")
+        return redirect('tournament_list')
+    return redirect('checkin_scanner', tournament_id=tournament.pk)
+
+
+@login_required
+def checkin_scanner(request, tournament_id):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    return render(request, 'tournament/checkin_scanner.html', {
+        'tournament': tournament,
+        'accommodations': Accommodation.objects.order_by('name'),
+        'headcount': headcount(tournament.pk),
+    })
+
+
+CHECKIN_STATUS_CODES = {'ok': 200, 'denied': 403, 'invalid': 400}
+
+
+@login_required
+@require_POST
+def checkin_scan(request, tournament_id):
+    """Check in the badge token in POST['token'] at POST['accommodation'] (an id), or the arena if empty."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    accommodation = request.POST.get('accommodation', '')
+    status, details = scan(
+        tournament_id, request.POST.get('token', ''),
+        int(accommodation) if accommodation.isdigit() else None, request.user,
+    )
+    return JsonResponse({'status': status, **details}, status=CHECKIN_STATUS_CODES[status])
+
+
+@login_required
+def checkin_headcount(request, tournament_id):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    return JsonResponse({'headcount': headcount(tournament.pk)})
+
+
+@login_required
+def tournament_invitations(request, tournament_id):
+    """Delivery state of the coaches' registration invitations; POST sends them to everyone not yet sent one."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    if request.method == 'POST':
+        queue_coach_invitations(tournament.pk)
+        messages.success(request, "Invitations are being sent to every coach not yet invited.")
+        return redirect('tournament_invitations', tournament_id=tournament.pk)
+    invitations = tournament.invitations.all()
+    counts = dict(invitations.values_list('status').annotate(n=Count('pk')).order_by())
+    return render(request, 'tournament/invitations.html', {
+        'tournament': tournament,
+        'counts': [(label, counts.get(status, 0)) for status, label in CoachInvitation.STATUS_CHOICES],
+        'failed': invitations.filter(status=CoachInvitation.FAILED).select_related('coach').order_by('coach__name'),
+    })
+
+
+RANK_FORM_HEADER = ['RANK', 'COUNTRY', 'GOLD', 'SILVER', 'BRONZE', 'TOTAL']
+
+
+@login_required
+def tournament_rank_form(request, tournament_id):
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    template_path = os.path.join(settings.BASE_DIR, RANK_FORM)
+    data = {
+        'title': tournament.name,
+        'subtitle': f"{tournament.edition}{tournament.get_ordinal_suffix(tournament.edition)} Edition Medal Table",
+        'rows': [
+            [row['rank'], row['country'], row['gold'], row['silver'], row['bronze'], row['total']]
+            for row in medal_table(tournament)
+        ],
+    }
+    # The medal table only changes when a result does, so the filled form is cached like the consent forms
+    key = form_cache_key(template_path, data)
+    etag = f'"{key}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    pdf_path = cached_form_path(
+        template_path, data,
+        lambda data: fill_rank_form(template_path, data['title'], data['subtitle'], RANK_FORM_HEADER, data['rows']),
+        key=key,
+    )
+    filename = f"{slugify(tournament.name).replace('-', '_')}_ranking.pdf"
+    response = FileResponse(open(pdf_path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+    response['ETag'] = etag
+    return response
+
+
 class TournamentUpdateView(UpdateView):
     model = Tournament
     form_class = TournamentForm
@@ -469,51 +944,43 @@ class TournamentParticipationListView( ListView):
     context_object_name = 'participations'
 
 
-@login_required
-def generate_pdf(request, tournament_id, athlete_id):
-    print(f"Starting PDF generation for tournament ID: {tournament_id} and athlete ID: {athlete_id}")
-    
-    # Fetch tournament and athlete
-    tournament = get_object_or_404(Tournament, id=tournament_id)
-    athlete = get_object_or_404(Athlete, id=athlete_id)
-    
-    # Define the template and output paths
-    pdf_template_path = os.path.join(settings.MEDIA_ROOT, 'doc', 'MO2024 INVITATION LETTER -  REG FORM1.pdf')
-    pdf_output_dir = os.path.join(settings.MEDIA_ROOT, 'completed_forms')
-    os.makedirs(pdf_output_dir, exist_ok=True)  # Ensure the output directory exists
-
-    pdf_output_path = os.path.join(pdf_output_dir, f'{athlete.name}_{tournament.edition}th Edition Consent Form.pdf')
-
-    FIELD_MAPPING = {
-        'Family Name': 'Text1',
-        'Given names': 'Text2',
-        'Gender': 'Text3',
-        'Birthday': 'Text4',
-        'Age': 'Text5',
-        'Weight': 'Text6',
-        'Nationality': 'Text7',
-        'Postal Address': 'Text8',
-        'Email': 'Text9',
-        'Telephone': 'Text10',
-        'Martial Arts Style': 'Text11',
-        'Instructor': 'Text12',
-        'Rank': 'Text13',
-        'Forms Competition': 'Check1',  # Assuming checkbox field names
-        'Special Techniques': 'Check2',
-        'Free Sparring': 'Check3',
-        'Competitor’s complete names': 'Text14',
-        'Competitor’s Signature': 'Text15',
-        'Date': 'Text16',
-    }
+CONSENT_FORM_TEMPLATE = os.path.join(settings.MEDIA_ROOT, 'doc', 'MO2024 INVITATION LETTER -  REG FORM1.pdf')
+
+FIELD_MAPPING = {
+    'Family Name': 'Text1',
+    'Given names': 'Text2',
+    'Gender': 'Text3',
+    'Birthday': 'Text4',
+    'Age': 'Text5',
+    'Weight': 'Text6',
+    'Nationality': 'Text7',
+    'Postal Address': 'Text8',
+    'Email': 'Text9',
+    'Telephone': 'Text10',
+    'Martial Arts Style': 'Text11',
+    'Instructor': 'Text12',
+    'Rank': 'Text13',
+    'Forms Competition': 'Check1',  # Assuming checkbox field names
+    'Special Techniques': 'Check2',
+    'Free Sparring': 'Check3',
+    'Competitor’s complete names': 'Text14',
+    'Competitor’s Signature': 'Text15',
+    'Date': 'Text16',
+}
+
+
+def consent_form_data(athlete, tournament):
+    """Form field values for an Athlete (or a Coach competing as one) entering `tournament`."""
+    coach = getattr(athlete, 'coach', None)
 
     # Create athlete data
     def get_category_checks(athlete):
         categories = athlete.category.all()
-        
+
         check1 = 'Yes' if any(category.name == 'individual_form' for category in categories) else 'No'
         check2 = 'Yes' if any(category.name == 'special_technique' for category in categories) else 'No'
         check3 = 'Yes' if any(category.name == 'sparring' for category in categories) else 'No'
-        
+
         return {
             'check1': check1,
             'Check2': check2,
@@ -533,44 +1000,101 @@ def generate_pdf(request, tournament_id, athlete_id):
         'Text8': athlete.email if athlete.email else '',
         'Text9': athlete.contacts if athlete.contacts else '',
         'Text10': str(athlete.belt) if athlete.belt else '',
-        'Text11': athlete.coach.name if athlete.coach else '',
-        'Text12': str(athlete.coach.belt) if athlete.coach and athlete.coach.belt else '',
+        'Text11': coach.name if coach else '',
+        'Text12': str(coach.belt) if coach and coach.belt else '',
         'Text13': athlete.name if athlete.name else '',
         'Text14': '',  # Add actual signature handling if necessary
-        'Text15': datetime.datetime.today().strftime('%d-%m-%Y'),  # Use current date
+        # The tournament's date, not today's: the values are the form's cache key and ETag
+        'Text15': tournament.start_date.strftime('%d-%m-%Y'),
     }
 
     # Add category checks to the athlete data
-    category_checks = get_category_checks(athlete)
-    athlete_data.update(category_checks)
+    athlete_data.update(get_category_checks(athlete))
+    return {FIELD_MAPPING.get(k, k): v for k, v in athlete_data.items()}
 
-    # Check if form fields are correctly retrieved
-    form_fields = fillpdfs.get_form_fields(pdf_template_path)
 
-    if not all(field in form_fields for field in athlete_data.keys()):
+def consent_form_filename(athlete, tournament):
+    return f'{athlete.name}_{tournament.edition}th Edition Consent Form.pdf'
+
+
+@login_required
+def generate_pdf(request, tournament_id, athlete_id=None):
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    if athlete_id is None:
+        return generate_tournament_pdfs(request, tournament)
+
+    athlete = get_object_or_404(
+        Athlete.objects.select_related('country', 'belt', 'coach__belt').prefetch_related('category'),
+        id=athlete_id,
+    )
+    template = get_template(CONSENT_FORM_TEMPLATE)
+    athlete_data = consent_form_data(athlete, tournament)
+
+    if not all(field in template.fields for field in athlete_data.keys()):
         return HttpResponse("Error: Some form fields are missing", status=400)
 
-    # Fill the PDF
-    try:
-        fillpdfs.write_fillable_pdf(
-            input_pdf_path=pdf_template_path,
-            output_pdf_path=pdf_output_path,
-            data_dict={FIELD_MAPPING.get(k, k): v for k, v in athlete_data.items()}
-        )
-        print(f"PDF successfully saved to {pdf_output_path}")
-
-        # Return the PDF as an HttpResponse for direct download
-        with open(pdf_output_path, 'rb') as pdf_file:
-            response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(pdf_output_path)}"'
-            return response
+    # Identical data gives an identical file, so the cache key doubles as the ETag
+    key = form_cache_key(CONSENT_FORM_TEMPLATE, athlete_data)
+    etag = f'"{key}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
 
+    try:
+        pdf_path = cached_form_path(CONSENT_FORM_TEMPLATE, athlete_data, template.fill, key=key)
     except Exception as e:
-        print(f"Error generating PDF for athlete {athlete.id}: {e}")
+        logger.exception("Error generating PDF for athlete %s: %s", athlete.id, e)
         return HttpResponse("Error generating PDF", status=500)
+
+    filename = consent_form_filename(athlete, tournament)
+    sendfile_header = getattr(settings, 'SENDFILE_HEADER', None)
+    if sendfile_header:
+        # Let the front-end server send the file
+        response = HttpResponse(content_type='application/pdf')
+        if sendfile_header == 'X-Accel-Redirect':
+            response[sendfile_header] = settings.MEDIA_URL + os.path.relpath(pdf_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        else:
+            response[sendfile_header] = pdf_path
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
     else:
+        response = FileResponse(open(pdf_path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+    response['ETag'] = etag
+    return response
+
+
+def generate_tournament_pdfs(request, tournament):
+    """Stream a ZIP with the consent form of everyone taking part in `tournament`."""
+    participations = (
+        TournamentParticipation.objects.filter(tournament=tournament)
+        .filter(Q(athlete__isnull=False) | Q(coach__is_athlete=True))
+        .select_related('athlete__country', 'athlete__belt', 'athlete__coach__belt', 'coach__country', 'coach__belt')
+        .prefetch_related('athlete__category', 'coach__category')
+        .order_by('pk')
+    )
+    if not participations.exists():
         return HttpResponse("No participations found", status=404)
 
+    def jobs():
+        # One form per competitor, even when they are entered in several categories
+        seen = set()
+        for participation in participations.iterator(chunk_size=200):
+            competitor = participation.athlete or participation.coach
+            key = (competitor.__class__, competitor.pk)
+            if key in seen:
+                continue
+            seen.add(key)
+            # Prefixed with kind and pk, as two competitors may share a name
+            name = f'{competitor._meta.model_name}-{competitor.pk}_{consent_form_filename(competitor, tournament)}'
+            yield name, consent_form_data(competitor, tournament)
+
+    forms = fill_many(CONSENT_FORM_TEMPLATE, jobs())
+    archive = zip_stream(forms)
+    if isinstance(request, ASGIRequest):
+        archive = iterate_in_thread(archive)
+    response = StreamingHttpResponse(archive, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{tournament.name} {tournament.edition}th Edition Consent Forms.zip"'
+    return response
+
 class TournamentParticipationCreateView(CreateView):
     model = TournamentParticipation
     form_class = TournamentParticipationForm
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tongmoodoo.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up; live results feeds are streamed without
+# tying up a thread per viewer, everything else goes to Django.
+from main1.live import LiveFeedApplication  # noqa: E402
+
+application = LiveFeedApplication(django_application)
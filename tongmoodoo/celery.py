@@ -2,6 +2,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tongmoodoo.settings')
@@ -14,3 +15,10 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def preload_form_templates(**kwargs):
+    # Parse the PDF form templates once per worker process instead of per task.
+    from main1.pdf_forms import preload_templates
+    preload_templates()
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main1.instrumentation.RequestMetricsMiddleware',  # first, so it sees every query
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,7 +67,8 @@ ROOT_URLCONF = 'tongmoodoo.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for the request metrics middleware
+        'BACKEND': 'main1.instrumentation.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates'),],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -173,6 +175,40 @@ STATICFILES_DIRS = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Cache backend: Redis when CACHE_REDIS_URL is set, a directory shared by all
+# processes when CACHE_DIR is set, otherwise per-process memory. Cached pages
+# and lookups are invalidated by signals in the process that made the change,
+# so run several web processes with Redis or a shared directory.
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+            'KEY_PREFIX': 'tongmoodoo',
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+            'KEY_PREFIX': 'tongmoodoo',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tongmoodoo',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Header used to hand cached consent forms to the web server instead of
+# streaming them from Django, e.g. 'X-Sendfile' (Apache/IIS) or
+# 'X-Accel-Redirect' (nginx). Leave unset to serve them with FileResponse.
+SENDFILE_HEADER = os.environ.get('SENDFILE_HEADER')
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -186,6 +222,59 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Run tasks in-process (no Redis/worker needed), e.g. for local development
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'false') == 'true'
+# Live results feeds are delivered in-process by default, which only reaches
+# viewers connected to the same process. Point this at Redis (e.g. the Celery
+# broker) when running several web processes.
+LIVE_RESULTS_REDIS_URL = os.environ.get('LIVE_RESULTS_REDIS_URL')
+
+# Absolute links in emails are built on this (no trailing slash)
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000').rstrip('/')
+
+# Emails are printed to the console unless another backend is configured,
+# e.g. django.core.mail.backends.smtp.EmailBackend with the EMAIL_HOST_*
+# settings below, or django.core.mail.backends.filebased.EmailBackend to
+# keep them in EMAIL_FILE_PATH (one file per connection).
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', str(BASE_DIR / 'sent_emails'))
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'false') == 'true'
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+# Coach invitation batches (main1.invitations) each worker sends, in Celery
+# rate limit syntax
+INVITATION_RATE_LIMIT = os.environ.get('INVITATION_RATE_LIMIT', '12/m')
+# How long the registration links in invitations work, in seconds
+REGISTRATION_LINK_MAX_AGE = int(os.environ.get('REGISTRATION_LINK_MAX_AGE', 30 * 24 * 60 * 60))
+
+# Request metrics (main1.instrumentation): requests issuing more queries than
+# QUERY_COUNT_THRESHOLD are logged as warnings (set it to '', 'none' or 'off'
+# to turn the check off), and Server-Timing headers are sent to everyone when
+# SERVER_TIMING_HEADER is on (staff always get them).
+_query_count_threshold = os.environ.get('QUERY_COUNT_THRESHOLD', '50').strip()
+QUERY_COUNT_THRESHOLD = (
+    None if _query_count_threshold.lower() in ('', 'none', 'off') else int(_query_count_threshold)
+)
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', str(DEBUG)).lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'main1.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
 # settings.py
 
 CELERYD_HIJACK_ROOT_LOGGER = False